@@ -9,9 +9,18 @@ import sys
 import signal
 import threading
 import time
-from flask import Flask, jsonify, request, send_from_directory
+import json
+import uuid
+import functools
+import hmac
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+from flask import Blueprint, Flask, current_app, jsonify, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
+import socketio
 import logging
 
 # Import FL-IDS core components
@@ -21,6 +30,9 @@ try:
         FederatedLearningNode,
         NetworkDataGenerator,
         RealTimeSystemMonitor,
+        ScoringEngine,
+        FlowIngestor,
+        FlowBatchFormat,
         FLPerformanceTester
     )
     FL_CORE_AVAILABLE = True
@@ -28,6 +40,30 @@ except ImportError:
     print("Warning: FL-IDS core not available. Some features may be limited.")
     FL_CORE_AVAILABLE = False
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    BaseApplication = object
+    GUNICORN_AVAILABLE = False
+
+from fl_ids_metrics import REGISTRY, CONTENT_TYPE, Counter, Histogram
+from fl_ids_profiler import SamplingProfiler, AllocationTracker
+
+# Components the profiler can narrow to: only stacks passing through these classes' methods are kept
+PROFILE_FOCUS = {
+    'training': (FederatedLearningServer, FederatedLearningNode),
+    'monitoring': (RealTimeSystemMonitor,),
+    'scoring': (ScoringEngine,),
+    'ingest': (FlowIngestor,)
+} if FL_CORE_AVAILABLE else {}
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,109 +71,877 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'agisfl-secret-key')
-CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+class FLJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes the numpy scalars and arrays found in FL results"""
+    
+    @staticmethod
+    def default(o):
+        if hasattr(o, 'tolist'):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+class SnapshotCache:
+    """TTL cache of expensive snapshots; concurrent requests for a stale key coalesce onto one refresh"""
+    
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'coalesced': 0, 'refreshes': 0, 'errors': 0}
+    
+    def put(self, key: str, value, version=None):
+        """Store a snapshot produced elsewhere (e.g. by a scheduled job)"""
+        with self._lock:
+            self._entries[key] = {'value': value, 'stored': time.monotonic(), 'version': version}
+    
+    def get(self, key: str, loader, ttl: float = None, version=None, serve_stale: bool = True):
+        """Return the cached snapshot if it is fresh and at the given version; otherwise one caller runs
+        loader while the rest get the stale value (or wait for the refresh when there is none)"""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['version'] == version and time.monotonic() - entry['stored'] < ttl:
+                self.stats['hits'] += 1
+                return entry['value']
+            
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {'done': threading.Event(), 'value': None, 'error': None}
+            elif serve_stale and entry:
+                self.stats['stale_hits'] += 1
+                return entry['value']
+            else:
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+        
+        try:
+            flight['value'] = loader()
+            self.put(key, flight['value'], version)
+            return flight['value']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                self.stats['refreshes'] += 1
+                self.stats['errors'] += flight['error'] is not None
+            flight['done'].set()
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, ttl=self.ttl, keys=len(self._entries))
 
-# Global variables
-fl_server = None
-system_monitor = None
-monitoring_thread = None
-monitoring_active = False
+JOB_DURATION = Histogram('agisfl_scheduled_job_seconds', 'Run time of scheduled background jobs', ['job'])
+JOB_MISSED_TICKS = Counter('agisfl_scheduled_job_missed_ticks_total',
+                           'Scheduler ticks skipped because the previous run was still going', ['job'])
 
-def initialize_fl_system():
-    """Initialize the federated learning system"""
-    global fl_server, system_monitor
+class PeriodicScheduler:
+    """Runs named jobs on independent fixed-rate cadences, each tick dispatched to an executor thread"""
     
-    if not FL_CORE_AVAILABLE:
-        logger.warning("FL core not available, running in demo mode")
-        return
+    def __init__(self):
+        self.jobs = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._running = False
     
-    try:
-        # Create FL server
-        fl_server = FederatedLearningServer('byzantine_tolerant_averaging')
+    def add_job(self, name: str, func, interval: float, initial_delay: float = 0.0):
+        """Register a job; it first runs after initial_delay and then every interval seconds"""
+        with self._condition:
+            self.jobs[name] = {
+                'func': func, 'interval': interval, 'initial_delay': initial_delay, 'next_run': None,
+                'running': False, 'runs': 0, 'failures': 0, 'missed_ticks': 0, 'overruns': 0,
+                'last_started': None, 'last_duration': None, 'max_duration': 0.0, 'total_duration': 0.0,
+                'last_error': None
+            }
+            self._condition.notify()
+    
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            now = time.monotonic()
+            for job in self.jobs.values():
+                job['next_run'] = now + job['initial_delay']
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.jobs)), thread_name_prefix='agisfl-job')
+        self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop dispatching; runs already in flight finish in the background"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _dispatch_loop(self):
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                for name, job in self.jobs.items():
+                    if job['next_run'] is None:
+                        job['next_run'] = now + job['initial_delay']
+                    if job['next_run'] <= now:
+                        self._dispatch(name, job, now)
+                wake = min((job['next_run'] for job in self.jobs.values()), default=now + 1.0)
+                self._condition.wait(max(0.0, wake - time.monotonic()))
+    
+    def _dispatch(self, name: str, job: dict, now: float):
+        if job['running']:
+            # The previous run is still going: skip the tick rather than queue work behind it
+            job['missed_ticks'] += 1
+            JOB_MISSED_TICKS.labels(name).inc()
+        else:
+            job['running'] = True
+            job['last_started'] = time.time()
+            self._executor.submit(self._execute, name, job)
         
-        # Create system monitor
-        system_monitor = RealTimeSystemMonitor()
+        # Stay on the fixed-rate grid, counting ticks that passed while the dispatcher lagged
+        ticks = int((now - job['next_run']) // job['interval']) + 1
+        job['missed_ticks'] += ticks - 1
+        JOB_MISSED_TICKS.labels(name).inc(ticks - 1)
+        job['next_run'] += ticks * job['interval']
+    
+    def _execute(self, name: str, job: dict):
+        start_time = time.monotonic()
+        error = None
+        try:
+            job['func']()
+        except Exception as e:
+            logger.error(f"Scheduled job {name} failed: {e}")
+            error = str(e)
+        duration = time.monotonic() - start_time
+        JOB_DURATION.labels(name).observe(duration)
         
-        # Create demo nodes
-        node_configs = [
-            ('enterprise_node_001', 'neural_network', 1.0),
-            ('enterprise_node_002', 'random_forest', 0.8),
-            ('enterprise_node_003', 'gradient_boosting', 1.2)
-        ]
+        with self._condition:
+            job['running'] = False
+            job['runs'] += 1
+            job['last_duration'] = duration
+            job['total_duration'] += duration
+            job['max_duration'] = max(job['max_duration'], duration)
+            if error:
+                job['failures'] += 1
+                job['last_error'] = error
+            if duration > job['interval']:
+                job['overruns'] += 1
+                logger.warning(f"Scheduled job {name} overran its {job['interval']}s interval ({duration:.2f}s)")
+    
+    def get_stats(self) -> dict:
+        """Per-job cadence, run counts, timings and missed ticks"""
+        with self._condition:
+            now = time.monotonic()
+            return {name: {
+                'interval': job['interval'],
+                'running': job['running'],
+                'runs': job['runs'],
+                'failures': job['failures'],
+                'missed_ticks': job['missed_ticks'],
+                'overruns': job['overruns'],
+                'last_started': job['last_started'],
+                'last_duration': job['last_duration'],
+                'avg_duration': job['total_duration'] / job['runs'] if job['runs'] else None,
+                'max_duration': job['max_duration'],
+                'next_run_in': max(0.0, job['next_run'] - now) if self._running and job['next_run'] else None,
+                'last_error': job['last_error']
+            } for name, job in self.jobs.items()}
+
+class JobManager:
+    """Runs long tasks on a bounded worker pool with pollable status, pushed progress and bounded history"""
+    
+    def __init__(self, max_workers: int = 1, max_active: int = 2, history: int = 20, on_event=None):
+        self.max_active = max_active  # Queued plus running jobs accepted at once
+        self.history = history
+        self.on_event = on_event  # Called with (event, job summary) on progress and completion
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='agisfl-task')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, kind: str, func):
+        """Queue func(progress) and return the job summary, or None when the active-job limit is reached"""
+        with self._lock:
+            if len(self._active()) >= self.max_active:
+                return None
+            job = {
+                'id': uuid.uuid4().hex, 'kind': kind, 'status': 'queued', 'progress': 0.0, 'stages': [],
+                'submitted': time.time(), 'started': None, 'finished': None, 'result': None, 'error': None
+            }
+            self._jobs[job['id']] = job
+            self._trim()
+            summary = self._summary(job)
+        self._executor.submit(self._run, job, func)
+        return summary
+    
+    def _active(self) -> list:
+        return [job for job in self._jobs.values() if job['status'] in ('queued', 'running')]
+    
+    def _trim(self):
+        # Drop the oldest finished jobs beyond the history limit; active jobs are never evicted
+        finished = [job_id for job_id, job in self._jobs.items() if job['finished'] is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+    
+    def _run(self, job: dict, func):
+        with self._lock:
+            job['status'] = 'running'
+            job['started'] = time.time()
+        self._publish('job_progress', job)
         
-        for node_id, model_type, privacy_budget in node_configs:
-            node = FederatedLearningNode(node_id, model_type, privacy_budget)
-            
-            # Generate training data
-            training_data = NetworkDataGenerator.generate_kdd_like_data(2000, 0.15)
-            node.add_training_data(training_data)
-            
-            # Register with server
-            fl_server.register_node(node)
-            logger.info(f"Registered FL node: {node_id} ({model_type})")
+        try:
+            result = func(lambda *args: self._stage(job, *args))
+            with self._lock:
+                job['status'] = 'succeeded'
+                job['result'] = result
+                job['progress'] = 1.0
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            with self._lock:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+        
+        with self._lock:
+            job['finished'] = time.time()
+            self._trim()
+        self._publish('job_finished', job)
+    
+    def _stage(self, job: dict, stage: str, index: int, total: int, duration: float = None):
+        """Progress callback: a stage started (duration None) or finished"""
+        with self._lock:
+            if duration is None:
+                job['stages'].append({'name': stage, 'status': 'running', 'started': time.time(), 'duration': None})
+                job['progress'] = index / total
+            else:
+                job['stages'][-1].update(status='done', duration=duration)
+                job['progress'] = (index + 1) / total
+        self._publish('job_progress', job)
+    
+    def _summary(self, job: dict) -> dict:
+        summary = {key: value for key, value in job.items() if key != 'result'}
+        summary['stages'] = [dict(stage) for stage in job['stages']]
+        summary['status_url'] = f"/api/jobs/{job['id']}"
+        return summary
+    
+    def _publish(self, event: str, job: dict):
+        if self.on_event is None:
+            return
+        with self._lock:
+            summary = self._summary(job)
+        self.on_event(event, summary)
+    
+    def get(self, job_id: str):
+        """Full job record including its result, or None if unknown or evicted"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(self._summary(job), result=job['result']) if job else None
+    
+    def list(self) -> list:
+        """Summaries of retained jobs, newest first"""
+        with self._lock:
+            return [self._summary(job) for job in reversed(self._jobs.values())]
+    
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._active())
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+STREAMS = ('system_metrics', 'scoring_metrics', 'fl_metrics')
+EVENT_STREAMS = ('jobs',)  # Plain event feeds: no state, so no deltas or throttling
+RATE_TIERS = {'realtime': 0.0, 'normal': 2.0, 'slow': 10.0}  # Minimum seconds between frames
+
+def _flatten(value, prefix: str = '', out: dict = None) -> dict:
+    """Flatten nested dicts into dotted paths; lists and scalars are leaves"""
+    out = {} if out is None else out
+    if isinstance(value, dict) and (value or not prefix):
+        for key, item in value.items():
+            _flatten(item, f'{prefix}.{key}' if prefix else str(key), out)
+    else:
+        out[prefix] = value.tolist() if hasattr(value, 'tolist') else value
+    return out
+
+class StreamBroadcaster:
+    """Room-scoped stream emission: clients subscribe per stream at a rate tier and encoding, and each
+    (stream, tier, encoding) room gets one delta frame per tick however many clients it holds"""
+    
+    def __init__(self, server: socketio.Server, keyframe_interval: int = 30):
+        self.server = server  # Local server, or a write-only message-queue emitter in the owner process
+        self.keyframe_interval = keyframe_interval  # Deltas between full keyframes
+        self._latest = {}  # stream -> newest flattened snapshot
+        self._rooms = {}
+        self._subscriptions = {}  # sid -> {stream: room}
+        self._lock = threading.RLock()
+        self.stats = {'frames': 0, 'keyframes': 0, 'fields_sent': 0, 'skipped_unchanged': 0}
+    
+    def subscribe(self, sid: str, streams, tier: str = 'normal', encoding: str = 'json') -> dict:
+        """Join the rooms for the given streams, replacing earlier subscriptions to them"""
+        if tier not in RATE_TIERS:
+            raise ValueError(f"Unknown rate tier {tier}")
+        if encoding == 'msgpack' and not MSGPACK_AVAILABLE:
+            encoding = 'json'
+        elif encoding not in ('json', 'msgpack'):
+            raise ValueError(f"Unknown encoding {encoding}")
         
-        logger.info("FL system initialized successfully")
+        joined = {}
+        with self._lock:
+            for stream in streams:
+                if stream in EVENT_STREAMS:
+                    room = stream
+                elif stream in STREAMS:
+                    room = f'{stream}:{tier}:{encoding}'
+                else:
+                    continue
+                self._leave(sid, stream)
+                self.server.enter_room(sid, room, namespace='/')
+                self._subscriptions.setdefault(sid, {})[stream] = room
+                joined[stream] = room
+                if stream in STREAMS:
+                    state = self._rooms.setdefault(room, {
+                        'room': room, 'stream': stream, 'interval': RATE_TIERS[tier], 'encoding': encoding, 'members': set(),
+                        'sent': None, 'seq': 0, 'since_keyframe': 0, 'last_emit': 0.0, 'pending': False
+                    })
+                    state['members'].add(sid)
+                    self._send_keyframe(state, sid)
+        return {'streams': joined, 'tier': tier, 'encoding': encoding}
+    
+    def _leave(self, sid: str, stream: str):
+        room = self._subscriptions.get(sid, {}).pop(stream, None)
+        if room is None:
+            return
+        self.server.leave_room(sid, room, namespace='/')
+        state = self._rooms.get(room)
+        if state:
+            state['members'].discard(sid)
+            if not state['members']:
+                del self._rooms[room]
+    
+    def unsubscribe(self, sid: str, streams=None):
+        with self._lock:
+            for stream in list(streams or self._subscriptions.get(sid, {})):
+                self._leave(sid, stream)
+            if not self._subscriptions.get(sid):
+                self._subscriptions.pop(sid, None)
+    
+    def resync(self, sid: str, stream: str):
+        """Resend a keyframe to one client that saw a gap in the sequence"""
+        with self._lock:
+            state = self._rooms.get(self._subscriptions.get(sid, {}).get(stream))
+            if state:
+                self._send_keyframe(state, sid)
+    
+    def _send_keyframe(self, state: dict, sid: str):
+        # New members start from the room's last sent state so later deltas apply cleanly
+        if state['sent'] is None:
+            if state['stream'] not in self._latest:
+                return
+            state['sent'] = self._latest[state['stream']]
+            state['seq'] += 1
+            state['last_emit'] = time.monotonic()
+        frame = {'seq': state['seq'], 'keyframe': True, 'data': state['sent']}
+        self.server.emit(state['stream'], self._encode(frame, state['encoding']), to=sid)
+    
+    def publish(self, stream: str, payload: dict):
+        """Record a stream's newest snapshot and emit to the rooms whose tier is due"""
+        flat = _flatten(payload)
+        with self._lock:
+            self._latest[stream] = flat
+            now = time.monotonic()
+            for state in self._rooms.values():
+                if state['stream'] == stream:
+                    state['pending'] = True
+                    if now - state['last_emit'] >= state['interval']:
+                        self._emit_frame(state, now)
+    
+    def flush(self):
+        """Emit held-back snapshots for rooms whose throttle interval has passed"""
+        with self._lock:
+            now = time.monotonic()
+            for state in self._rooms.values():
+                if state['pending'] and now - state['last_emit'] >= state['interval']:
+                    self._emit_frame(state, now)
+    
+    def send_event(self, stream: str, event: str, payload: dict):
+        self.server.emit(event, payload, to=stream)
+    
+    def _emit_frame(self, state: dict, now: float):
+        flat = self._latest[state['stream']]
+        sent = state['sent']
+        state['pending'] = False
+        if sent is None or state['since_keyframe'] >= self.keyframe_interval:
+            frame = {'keyframe': True, 'data': flat}
+            state['since_keyframe'] = 0
+            self.stats['keyframes'] += 1
+            self.stats['fields_sent'] += len(flat)
+        else:
+            changed = {path: value for path, value in flat.items() if path not in sent or sent[path] != value}
+            removed = [path for path in sent if path not in flat]
+            if not changed and not removed:
+                self.stats['skipped_unchanged'] += 1
+                return
+            frame = {'keyframe': False, 'set': changed, 'unset': removed}
+            state['since_keyframe'] += 1
+            self.stats['fields_sent'] += len(changed) + len(removed)
         
-    except Exception as e:
-        logger.error(f"Failed to initialize FL system: {e}")
-        fl_server = None
-        system_monitor = None
+        state['seq'] += 1
+        frame['seq'] = state['seq']
+        state['sent'] = flat
+        state['last_emit'] = now
+        self.stats['frames'] += 1
+        self.server.emit(state['stream'], self._encode(frame, state['encoding']), to=state['room'])
+    
+    @staticmethod
+    def _encode(frame: dict, encoding: str):
+        if encoding == 'msgpack':
+            return msgpack.packb(frame, use_bin_type=True)
+        return frame
+    
+    def disconnect(self, sid: str):
+        self.unsubscribe(sid)
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, rooms={room: len(state['members']) for room, state in self._rooms.items()})
 
-def monitoring_worker():
-    """Background monitoring worker"""
-    global monitoring_active
+# Used when AGISFL_NODES is not set. Every node must produce the same model shape to be aggregated, and
+# only logistic regression models can be scored
+DEFAULT_NODE_SPECS = [
+    {'node_id': 'enterprise_node_001', 'model_type': 'logistic_regression', 'privacy_budget': 1.0},
+    {'node_id': 'enterprise_node_002', 'model_type': 'logistic_regression', 'privacy_budget': 0.8},
+    {'node_id': 'enterprise_node_003', 'model_type': 'logistic_regression', 'privacy_budget': 1.2}
+]
+
+def load_node_specs(source: str = None) -> list:
+    """Node specs (see FederatedLearningNode.from_spec) from AGISFL_NODES: an inline JSON list or a path to
+    a JSON file. A spec with "replicas": n expands to n nodes with -000, -001, ... appended to its node_id"""
+    source = os.environ.get('AGISFL_NODES') if source is None else source
+    if not source:
+        return [dict(spec) for spec in DEFAULT_NODE_SPECS]
+    if source.lstrip().startswith('['):
+        specs = json.loads(source)
+    else:
+        with open(source) as f:
+            specs = json.load(f)
+    
+    expanded = []
+    for spec in specs:
+        if 'node_id' not in spec:
+            raise ValueError(f"Node spec without node_id: {spec}")
+        replicas = spec.pop('replicas', None)
+        if replicas is None:
+            expanded.append(spec)
+        else:
+            expanded.extend(dict(spec, node_id=f"{spec['node_id']}-{i:03d}") for i in range(replicas))
+    
+    node_ids = [spec['node_id'] for spec in expanded]
+    if len(set(node_ids)) != len(node_ids):
+        raise ValueError("Node specs contain duplicate node_id values")
+    return expanded
+
+class AgisFLService:
+    """Owns the FL server, monitors, scheduler and background jobs. Routes call it directly in a single
+    process; production workers reach the one instance in the owner process through StateManager proxies"""
+    
+    def __init__(self, server: socketio.Server):
+        self.fl_server = None
+        self.system_monitor = None
+        self.scoring_engine = None
+        self.flow_ingestor = None
+        self.scheduler = None
+        self.monitoring_active = False
+        self.broadcaster = StreamBroadcaster(server, keyframe_interval=int(os.environ.get('AGISFL_KEYFRAME_INTERVAL', 30)))
+        self.job_manager = JobManager(
+            max_workers=int(os.environ.get('AGISFL_JOB_WORKERS', 1)),
+            max_active=int(os.environ.get('AGISFL_MAX_ACTIVE_JOBS', 2)),
+            history=int(os.environ.get('AGISFL_JOB_HISTORY', 20)),
+            on_event=lambda event, summary: self.broadcaster.send_event('jobs', event, summary)
+        )
+        self.snapshot_cache = SnapshotCache(float(os.environ.get('AGISFL_SNAPSHOT_TTL', 5)))
+        self.readiness = {'phase': 'pending', 'started': None, 'phase_started': None, 'elapsed': 0.0,
+                          'phase_durations': {}, 'nodes_total': 0, 'nodes_loaded': 0, 'error': None}
+        self._readiness_lock = threading.Lock()
+        self.profiler = SamplingProfiler(max_duration=float(os.environ.get('AGISFL_PROFILE_MAX_SECONDS', 300)))
+        self.allocations = AllocationTracker()
     
-    while monitoring_active:
+    def initialize(self, background: bool = False):
+        """Initialize the federated learning system; in the background the server can bind its port at
+        once while get_status() reports the readiness phase"""
+        if background:
+            threading.Thread(target=self.initialize, name='agisfl-init', daemon=True).start()
+            return
+        
+        self._set_phase('starting')
+        if not FL_CORE_AVAILABLE:
+            logger.warning("FL core not available, running in demo mode")
+            self._set_phase('demo')
+            return
+        
         try:
-            # Get system metrics
-            if system_monitor:
-                metrics = system_monitor.get_system_metrics()
-                
-                # Emit real-time data via WebSocket
-                socketio.emit('system_metrics', metrics)
-                
-                # Run FL training round periodically
-                if fl_server and hasattr(fl_server, 'nodes') and len(fl_server.nodes) > 0:
-                    if fl_server.training_rounds % 5 == 0:  # Every 5th cycle
-                        success = fl_server.start_training_round()
-                        if success:
-                            fl_metrics = fl_server.get_training_metrics()
-                            socketio.emit('fl_metrics', fl_metrics)
+            # Create FL server, resuming from the last checkpoint if there is one
+            fl_server = FederatedLearningServer('byzantine_tolerant_averaging')
+            checkpoint_dir = os.environ.get('AGISFL_CHECKPOINT_DIR', 'fl_checkpoints')
+            if fl_server.restore_checkpoint(checkpoint_dir):
+                logger.info(f"Resumed FL state at round {fl_server.training_rounds}")
+            fl_server.enable_checkpointing(
+                checkpoint_dir,
+                interval_rounds=int(os.environ.get('AGISFL_CHECKPOINT_INTERVAL', 1))
+            )
+            self.fl_server = fl_server
+            
+            # Create system monitor, screening traffic against a blocklist when one is configured
+            self.system_monitor = RealTimeSystemMonitor()
+            blocklist = os.environ.get('AGISFL_BLOCKLIST')
+            if blocklist:
+                stats = self.system_monitor.load_reputation(blocklist)
+                logger.info(f"Loaded IP blocklist {blocklist}: {stats['addresses']} addresses, "
+                            f"{stats['networks']} networks in {stats['load_time']:.2f}s")
             
-            # Wait before next monitoring cycle
-            time.sleep(10)  # 10-second intervals
+            # Register every node up front with deferred data, then load the datasets in parallel
+            self._set_phase('registering_nodes')
+            specs = load_node_specs()
+            self.readiness['nodes_total'] = len(specs)
+            for spec in specs:
+                fl_server.register_node(FederatedLearningNode.from_spec(spec, lazy=True))
+            logger.info(f"Registered {len(specs)} FL nodes")
+            
+            self._set_phase('loading_data')
+            with ThreadPoolExecutor(max_workers=int(os.environ.get('AGISFL_INIT_WORKERS', 4)),
+                                    thread_name_prefix='agisfl-init') as pool:
+                list(pool.map(self._load_node_data, list(fl_server.nodes.values())))
+            # A node whose model shape differs from the rest would be dropped from every round
+            fl_server.reconcile_model_shape()
+            
+            # Score live flows against each new global model as it is published
+            self._set_phase('starting_scoring')
+            training_data = next(iter(fl_server.nodes.values())).training_data if fl_server.nodes else \
+                NetworkDataGenerator.generate_kdd_like_data(10, 0.15)
+            num_features = training_data.drop(columns='label').select_dtypes('number').shape[1]
+            self.scoring_engine = ScoringEngine.for_server(fl_server, num_features,
+                                                           reputation=self.system_monitor.reputation)
+            self.scoring_engine.start()
+            
+            # Streamed flow batches are scored and spread across the nodes' training windows
+            self.flow_ingestor = FlowIngestor(FederatedLearningNode._feature_columns(training_data),
+                                              nodes=lambda: fl_server.nodes, scoring_engine=self.scoring_engine,
+                                              max_queue_rows=int(os.environ.get('AGISFL_INGEST_QUEUE_ROWS', 200000)))
+            self.flow_ingestor.start()
+            
+            self._set_phase('ready')
+            logger.info(f"FL system initialized successfully in {self.readiness['elapsed']:.2f}s")
             
         except Exception as e:
-            logger.error(f"Monitoring error: {e}")
-            time.sleep(5)
+            logger.error(f"Failed to initialize FL system: {e}")
+            self.fl_server = None
+            self.system_monitor = None
+            self.scoring_engine = None
+            self.flow_ingestor = None
+            self.readiness['error'] = str(e)
+            self._set_phase('failed')
+    
+    def _set_phase(self, phase: str):
+        with self._readiness_lock:
+            now = time.time()
+            readiness = self.readiness
+            if readiness['started'] is None:
+                readiness['started'] = now
+            elif readiness['phase'] in readiness['phase_durations']:
+                readiness['phase_durations'][readiness['phase']] = now - readiness['phase_started']
+            readiness.update(phase=phase, phase_started=now, elapsed=now - readiness['started'])
+            if phase not in ('ready', 'failed', 'demo'):
+                readiness['phase_durations'][phase] = None
+    
+    def _load_node_data(self, node):
+        node.training_data  # Runs the node's deferred loader
+        with self._readiness_lock:
+            self.readiness['nodes_loaded'] += 1
+    
+    def get_readiness(self) -> dict:
+        with self._readiness_lock:
+            readiness = dict(self.readiness, phase_durations=dict(self.readiness['phase_durations']))
+        if readiness['started'] is not None and readiness['phase'] not in ('ready', 'failed', 'demo'):
+            readiness['elapsed'] = time.time() - readiness['started']
+        return readiness
+    
+    def is_ready(self) -> bool:
+        return self.readiness['phase'] == 'ready'
+    
+    def sample_metrics_job(self):
+        """Sample system metrics and feed this interval's flows to the scoring engine"""
+        if self.system_monitor:
+            metrics = self.system_monitor.get_system_metrics()  # Blocks ~1s for the CPU sample
+            self.snapshot_cache.put('system_metrics', metrics)
+            # The process and user lists churn every sample; clients that need them poll /api/system-metrics
+            self.broadcaster.publish('system_metrics', {key: value for key, value in metrics.items()
+                                                        if key not in ('processes', 'users')})
+        
+        # Simulated traffic stands in for a live flow exporter
+        if self.scoring_engine:
+            self.scoring_engine.submit(NetworkDataGenerator.generate_kdd_like_data(500, 0.15))
+    
+    def emit_metrics_job(self):
+        """Publish scoring stats and flush throttled streams to subscribed clients"""
+        if self.scoring_engine:
+            self.broadcaster.publish('scoring_metrics', self.scoring_engine.get_stats())
+        self.broadcaster.flush()
+    
+    def training_job(self):
+        """Run one FL training round and publish its metrics"""
+        if self.is_ready() and self.fl_server.nodes:
+            if self.fl_server.start_training_round():
+                fl_metrics = self.fl_server.get_training_metrics()
+                self.snapshot_cache.put('fl_metrics', json.dumps(fl_metrics), version=self.fl_server.model_version)
+                # Keyed by round, so each delta carries the new round instead of the whole window
+                self.broadcaster.publish('fl_metrics', dict(fl_metrics, training_history={
+                    str(record.get('round', index)): record
+                    for index, record in enumerate(fl_metrics.get('training_history', []))}))
+    
+    def start_monitoring(self):
+        """Start background monitoring"""
+        if self.monitoring_active:
+            return
+        
+        self.scheduler = PeriodicScheduler()
+        self.scheduler.add_job('metrics', self.sample_metrics_job, float(os.environ.get('AGISFL_METRICS_INTERVAL', 10)))
+        self.scheduler.add_job('emit', self.emit_metrics_job, float(os.environ.get('AGISFL_EMIT_INTERVAL', 2)),
+                               initial_delay=1.0)
+        self.scheduler.add_job('training', self.training_job, float(os.environ.get('AGISFL_TRAINING_INTERVAL', 50)))
+        self.scheduler.start()
+        self.monitoring_active = True
+        logger.info("Background monitoring started")
+    
+    def stop_monitoring(self):
+        """Stop background monitoring"""
+        self.monitoring_active = False
+        if self.scheduler:
+            self.scheduler.stop()
+        logger.info("Background monitoring stopped")
+    
+    def get_status(self) -> dict:
+        readiness = self.get_readiness()
+        return {
+            'ready': readiness['phase'] == 'ready',
+            'readiness': readiness,
+            'fl_core_available': FL_CORE_AVAILABLE,
+            'monitoring_active': self.monitoring_active,
+            'fl_server_active': self.fl_server is not None,
+            'system_monitor_active': self.system_monitor is not None,
+            'scoring_engine_active': self.scoring_engine is not None,
+            'nodes_count': len(self.fl_server.nodes) if self.fl_server else 0,
+            'scheduled_jobs': self.scheduler.get_stats() if self.scheduler else {},
+            'active_jobs': self.job_manager.active_count(),
+            'snapshot_cache': self.snapshot_cache.get_stats(),
+            'streams': self.broadcaster.get_stats(),
+            'ingest': self.flow_ingestor.get_stats() if self.flow_ingestor else {}
+        }
+    
+    def get_fl_metrics_json(self):
+        """Training metrics as a JSON string, or None until the FL system is ready"""
+        # The server exists early in initialization, but nodes are still being registered then
+        if not self.fl_server or not self.is_ready():
+            return None
+        # Pre-serialized once per model version; the TTL bounds how stale the latency/status fields get
+        return self.snapshot_cache.get('fl_metrics', lambda: json.dumps(self.fl_server.get_training_metrics()),
+                                       ttl=30.0, version=self.fl_server.model_version)
+    
+    def get_system_metrics(self):
+        if not self.system_monitor:
+            return None
+        return self.snapshot_cache.get('system_metrics', self.system_monitor.get_system_metrics)
+    
+    def get_scoring_metrics(self):
+        if not self.scoring_engine or not self.is_ready():
+            return None
+        return self.scoring_engine.get_stats()
+    
+    def run_tests(self):
+        """Queue the performance test suite; returns the job summary, or None at the active-job limit"""
+        return self.job_manager.submit('performance_tests',
+                                       lambda progress: FLPerformanceTester().run_comprehensive_test(progress))
+    
+    def list_jobs(self) -> list:
+        return self.job_manager.list()
+    
+    def get_job(self, job_id: str):
+        return self.job_manager.get(job_id)
+    
+    def get_ingest_schema(self):
+        """Feature columns streamed batches must carry, or None when ingestion is unavailable"""
+        return self.flow_ingestor.feature_names if self.flow_ingestor else None
+    
+    def submit_flows(self, features, labels, rejected: int = 0, addresses=None):
+        """Queue a parsed batch; returns None once queued, or the Retry-After seconds when the queue is full"""
+        if not self.flow_ingestor:
+            raise RuntimeError("Flow ingestion not available")
+        if self.flow_ingestor.submit(features, labels, rejected, addresses):
+            return None
+        return self.flow_ingestor.retry_after()
+    
+    def subscribe(self, sid: str, streams, tier: str = 'normal', encoding: str = 'json') -> dict:
+        return self.broadcaster.subscribe(sid, streams, tier, encoding)
+    
+    def unsubscribe(self, sid: str, streams=None):
+        self.broadcaster.unsubscribe(sid, streams)
+    
+    def resync(self, sid: str, stream: str):
+        self.broadcaster.resync(sid, stream)
+    
+    def disconnect(self, sid: str):
+        self.broadcaster.disconnect(sid)
+    
+    def render_metrics(self) -> str:
+        return REGISTRY.render()
+    
+    def start_profile(self, duration: float = 30.0, interval: float = 0.005, threads=None, focus=()) -> dict:
+        """Start a time-bounded sampling session, optionally narrowed to PROFILE_FOCUS components"""
+        unknown = [name for name in focus if name not in PROFILE_FOCUS]
+        if unknown:
+            raise ValueError(f"Unknown profile focus {unknown}; expected some of {sorted(PROFILE_FOCUS)}")
+        return self.profiler.start(duration, interval, threads,
+                                   [cls for name in focus for cls in PROFILE_FOCUS[name]])
+    
+    def stop_profile(self) -> dict:
+        return self.profiler.stop()
+    
+    def get_profile(self) -> dict:
+        return self.profiler.status()
+    
+    def get_collapsed_profile(self) -> str:
+        return self.profiler.collapsed()
+    
+    def memory_snapshot(self, frames: int = 10) -> dict:
+        return self.allocations.snapshot(frames)
+    
+    def memory_diff(self, limit: int = 20, group_by: str = 'lineno') -> dict:
+        return self.allocations.diff(limit, group_by)
+    
+    def stop_memory_tracing(self) -> dict:
+        return self.allocations.stop()
+    
+    def shutdown(self):
+        """Stop background work and flush the pending checkpoint"""
+        self.profiler.stop()
+        self.stop_monitoring()
+        self.job_manager.shutdown()
+        if self.flow_ingestor:
+            self.flow_ingestor.stop()
+        if self.scoring_engine:
+            self.scoring_engine.stop()
+        if self.fl_server:
+            self.fl_server.shutdown()
 
-def start_monitoring():
-    """Start background monitoring"""
-    global monitoring_thread, monitoring_active
+class MessageHub:
+    """In-process fan-out of Socket.IO pub/sub messages, served from the owner process as a local
+    stand-in for Redis or AMQP when AGISFL_MESSAGE_QUEUE is not set"""
+    
+    def __init__(self, backlog: int = 10000, idle_timeout: float = 60.0):
+        self.backlog = backlog  # Per-subscriber bound, so a stalled worker cannot grow the owner without limit
+        self.idle_timeout = idle_timeout  # Subscribers that stop receiving (dead workers) are dropped after this
+        self._queues = {}
+        self._last_seen = {}
+        self._condition = threading.Condition()
+    
+    def subscribe(self) -> str:
+        with self._condition:
+            subscriber = uuid.uuid4().hex
+            self._queues[subscriber] = deque(maxlen=self.backlog)
+            self._last_seen[subscriber] = time.monotonic()
+            return subscriber
     
-    if monitoring_active:
-        return
+    def unsubscribe(self, subscriber: str):
+        with self._condition:
+            self._queues.pop(subscriber, None)
+            self._last_seen.pop(subscriber, None)
     
-    monitoring_active = True
-    monitoring_thread = threading.Thread(target=monitoring_worker, daemon=True)
-    monitoring_thread.start()
-    logger.info("Background monitoring started")
+    def publish(self, message):
+        with self._condition:
+            now = time.monotonic()
+            for subscriber, queue in list(self._queues.items()):
+                if now - self._last_seen[subscriber] > self.idle_timeout:
+                    del self._queues[subscriber], self._last_seen[subscriber]
+                    continue
+                queue.append(message)
+            self._condition.notify_all()
+    
+    def receive(self, subscriber: str, timeout: float = 5.0) -> list:
+        """Block until messages are queued for subscriber (or timeout) and return all of them"""
+        with self._condition:
+            queue = self._queues.get(subscriber)
+            if queue is None:
+                raise KeyError(f"Unknown subscriber {subscriber}")
+            if not queue:
+                self._condition.wait(timeout)
+            self._last_seen[subscriber] = time.monotonic()
+            messages = list(queue)
+            queue.clear()
+            return messages
 
-def stop_monitoring():
-    """Stop background monitoring"""
-    global monitoring_active
+class HubClientManager(socketio.PubSubManager):
+    """Socket.IO client manager that shares rooms and emits across processes through a MessageHub"""
+    
+    name = 'agisfl-hub'
+    
+    def __init__(self, hub, channel: str = 'flask-socketio', write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.hub = hub  # MessageHub, or a StateManager proxy to the owner's
+    
+    def _publish(self, data):
+        self.hub.publish(data)
     
-    monitoring_active = False
-    if monitoring_thread and monitoring_thread.is_alive():
-        monitoring_thread.join(timeout=5)
-    logger.info("Background monitoring stopped")
+    def _listen(self):
+        subscriber = self.hub.subscribe()
+        while True:
+            try:
+                messages = self.hub.receive(subscriber)
+            except KeyError:
+                subscriber = self.hub.subscribe()  # Evicted after a long stall; messages in between are lost
+                continue
+            except (EOFError, OSError) as e:
+                logger.error(f"Message hub connection lost: {e}")
+                return  # The owner process is gone; nothing more will arrive
+            yield from messages
+
+def _queue_manager(url: str, write_only: bool = False) -> socketio.PubSubManager:
+    """Client manager for an external message queue, picked by URL scheme as Flask-SocketIO does"""
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel='flask-socketio', write_only=write_only)
+    return socketio.KombuManager(url, channel='flask-socketio', write_only=write_only)
+
+class StateManager(BaseManager):
+    """IPC server in the owner process exposing the AgisFLService and MessageHub to worker processes"""
+
+_owner = {}  # Populated only inside the owner process, by _init_owner
+
+def _init_owner(message_queue):
+    """Build the one FL-owning service in the owner process, emitting to clients through the message queue"""
+    _owner['hub'] = MessageHub()
+    manager = _queue_manager(message_queue, write_only=True) if message_queue else \
+        HubClientManager(_owner['hub'], write_only=True)
+    _owner['service'] = AgisFLService(socketio.Server(client_manager=manager, async_mode='threading'))
+    _owner['service'].initialize(background=True)  # Workers start serving while the FL system loads
+
+def _owner_service():
+    return _owner['service']
+
+def _owner_hub():
+    return _owner['hub']
+
+StateManager.register('service', callable=_owner_service)
+StateManager.register('hub', callable=_owner_hub)
 
 # Flask routes
-@app.route('/')
+api = Blueprint('agisfl', __name__)
+
+@api.route('/')
 def index():
     """Serve the main application"""
     return '''
@@ -304,24 +1108,62 @@ def index():
         </div>
         
         <script>
-            const socket = io();
+            const socket = io({transports: __SOCKETIO_TRANSPORTS__});
+            
+            const streamState = {};
+            
+            // Rebuild a stream's state from keyframe/delta frames keyed by dotted paths
+            function applyFrame(stream, frame) {
+                let state = streamState[stream];
+                if (frame.keyframe) {
+                    state = streamState[stream] = {seq: frame.seq, flat: Object.assign({}, frame.data)};
+                } else if (!state || frame.seq !== state.seq + 1) {
+                    socket.emit('resync', {stream: stream});
+                    return null;
+                } else {
+                    Object.assign(state.flat, frame.set);
+                    frame.unset.forEach(path => delete state.flat[path]);
+                    state.seq = frame.seq;
+                }
+                const data = {};
+                Object.entries(state.flat).forEach(([path, value]) => {
+                    const keys = path.split('.');
+                    let node = data;
+                    keys.slice(0, -1).forEach(key => node = node[key] = node[key] || {});
+                    node[keys[keys.length - 1]] = value;
+                });
+                return data;
+            }
             
             socket.on('connect', function() {
                 console.log('Connected to AgisFL server');
                 document.getElementById('monitoring-status').textContent = 'Connected';
+                socket.emit('subscribe', {
+                    streams: ['system_metrics', 'scoring_metrics', 'fl_metrics', 'jobs'], tier: 'normal'
+                });
             });
             
-            socket.on('system_metrics', function(data) {
+            socket.on('system_metrics', function(frame) {
+                const data = applyFrame('system_metrics', frame);
+                if (!data) return;
                 if (data.cpu) {
-                    document.getElementById('cpu-usage').textContent = data.cpu.toFixed(1) + '%';
+                    document.getElementById('cpu-usage').textContent = data.cpu.percent.toFixed(1) + '%';
                 }
                 if (data.memory) {
-                    document.getElementById('memory-usage').textContent = data.memory.percentage.toFixed(1) + '%';
+                    document.getElementById('memory-usage').textContent = data.memory.percent.toFixed(1) + '%';
                 }
                 document.getElementById('last-update').textContent = new Date().toLocaleTimeString();
             });
             
-            socket.on('fl_metrics', function(data) {
+            socket.on('scoring_metrics', function(frame) {
+                const data = applyFrame('scoring_metrics', frame);
+                if (!data) return;
+                document.getElementById('active-threats').textContent = data.active_threats;
+            });
+            
+            socket.on('fl_metrics', function(frame) {
+                const data = applyFrame('fl_metrics', frame);
+                if (!data) return;
                 if (data.total_rounds) {
                     document.getElementById('training-rounds').textContent = data.total_rounds;
                 }
@@ -353,14 +1195,32 @@ def index():
                     .catch(e => console.error('Error:', e));
             }
             
+            socket.on('job_progress', function(job) {
+                const stage = job.stages.length ? job.stages[job.stages.length - 1].name : job.status;
+                document.getElementById('monitoring-status').textContent =
+                    'Testing: ' + stage + ' (' + Math.round(job.progress * 100) + '%)';
+            });
+            
+            socket.on('job_finished', function(job) {
+                fetch(job.status_url)
+                    .then(r => r.json())
+                    .then(data => {
+                        console.log('Test results:', data);
+                        document.getElementById('monitoring-status').textContent =
+                            data.status === 'succeeded' ? 'Tests Complete' : 'Test Error';
+                    });
+            });
+            
             function runTests() {
                 document.getElementById('monitoring-status').textContent = 'Testing...';
                 fetch('/api/run-tests', {method: 'POST'})
                     .then(r => r.json())
                     .then(data => {
-                        alert('Tests completed! Check console for results.');
-                        console.log('Test results:', data);
-                        document.getElementById('monitoring-status').textContent = 'Tests Complete';
+                        if (!data.success) {
+                            document.getElementById('monitoring-status').textContent = data.error;
+                            return;
+                        }
+                        console.log('Test job queued:', data.job_id);
                     })
                     .catch(e => {
                         console.error('Test error:', e);
@@ -370,114 +1230,363 @@ def index():
         </script>
     </body>
     </html>
-    '''
+    '''.replace('__SOCKETIO_TRANSPORTS__', json.dumps(current_app.config['SOCKETIO_TRANSPORTS']))
 
-@app.route('/api/status')
+@api.route('/api/status')
 def get_status():
     """Get system status"""
-    return jsonify({
-        'fl_core_available': FL_CORE_AVAILABLE,
-        'monitoring_active': monitoring_active,
-        'fl_server_active': fl_server is not None,
-        'system_monitor_active': system_monitor is not None,
-        'nodes_count': len(fl_server.nodes) if fl_server else 0
-    })
-
-@app.route('/api/start-monitoring', methods=['POST'])
+    return jsonify(_read('status', _service().get_status))
+
+@api.route('/metrics')
+def get_prometheus_metrics():
+    """Counters, gauges and latency histograms in Prometheus text format"""
+    return current_app.response_class(_service().render_metrics(), content_type=CONTENT_TYPE)
+
+@api.route('/api/start-monitoring', methods=['POST'])
 def start_monitoring_endpoint():
     """Start system monitoring"""
     try:
-        start_monitoring()
+        _service().start_monitoring()
         return jsonify({'success': True, 'message': 'Monitoring started'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/stop-monitoring', methods=['POST'])
+@api.route('/api/stop-monitoring', methods=['POST'])
 def stop_monitoring_endpoint():
     """Stop system monitoring"""
     try:
-        stop_monitoring()
+        _service().stop_monitoring()
         return jsonify({'success': True, 'message': 'Monitoring stopped'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/run-tests', methods=['POST'])
+@api.route('/api/run-tests', methods=['POST'])
 def run_tests():
-    """Run FL-IDS performance tests"""
-    try:
-        if not FL_CORE_AVAILABLE:
-            return jsonify({
-                'success': False,
-                'error': 'FL core not available for testing'
-            })
-        
-        # Run comprehensive tests
-        tester = FLPerformanceTester()
-        results = tester.run_comprehensive_test()
-        
+    """Queue FL-IDS performance tests; progress streams as job_progress events and is pollable at /api/jobs/<id>"""
+    if not FL_CORE_AVAILABLE:
         return jsonify({
-            'success': True,
-            'results': results,
-            'message': 'Tests completed successfully'
+            'success': False,
+            'error': 'FL core not available for testing'
         })
-        
-    except Exception as e:
-        logger.error(f"Test error: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    service = _service()
+    job = service.run_tests()
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Too many test jobs in progress',
+            'active_jobs': [summary['id'] for summary in service.list_jobs()
+                            if summary['status'] in ('queued', 'running')]
+        }), 429
+    
+    return jsonify({'success': True, 'job_id': job['id'], 'status_url': job['status_url'], 'job': job}), 202
+
+@api.route('/api/jobs')
+def list_jobs():
+    """List retained background jobs, newest first"""
+    return jsonify(_service().list_jobs())
 
-@app.route('/api/fl-metrics')
+@api.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Get a background job's status, stage timings and (once finished) its result"""
+    job = _service().get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@api.route('/api/fl-metrics')
 def get_fl_metrics():
     """Get federated learning metrics"""
-    if not fl_server:
-        return jsonify({'error': 'FL server not available'})
-    
-    return jsonify(fl_server.get_training_metrics())
+    body = _read('fl_metrics', _service().get_fl_metrics_json)
+    if body is None:
+        return _unavailable('FL server not available')
+    return current_app.response_class(body, mimetype='application/json')
 
-@app.route('/api/system-metrics')
+@api.route('/api/system-metrics')
 def get_system_metrics():
     """Get system metrics"""
-    if not system_monitor:
-        return jsonify({'error': 'System monitor not available'})
+    metrics = _read('system_metrics', _service().get_system_metrics)
+    if metrics is None:
+        return _unavailable('System monitor not available')
+    return jsonify(metrics)
+
+@api.route('/api/scoring-metrics')
+def get_scoring_metrics():
+    """Get real-time scoring throughput, latency and threat counts"""
+    stats = _read('scoring_metrics', _service().get_scoring_metrics)
+    if stats is None:
+        return _unavailable('Scoring engine not available')
+    return jsonify(stats)
+
+@api.route('/api/fl-ids/schema')
+def get_ingest_schema():
+    """Columns a stream-data batch must carry, plus the optional label and address columns"""
+    parser = _flow_parser()
+    if not parser:
+        return _unavailable('Flow ingestion not available')
+    return jsonify({'features': parser.feature_names, 'label': 'label',
+                    'address_columns': list(FlowIngestor.ADDRESS_COLUMNS),
+                    'content_types': ['application/json', 'application/x-ndjson', FlowBatchFormat.CONTENT_TYPE]})
+
+@api.route('/api/fl-ids/stream-data', methods=['POST'])
+def stream_data():
+    """Ingest a batch of flow records (JSON records or columns, NDJSON, or the binary columnar format)"""
+    parser = _flow_parser()
+    if not parser:
+        return _unavailable('Flow ingestion not available')
     
-    return jsonify(system_monitor.get_system_metrics())
+    # Parsed in this worker; only the validated arrays cross to the owner's queue
+    try:
+        features, labels, addresses, rejected = parser.parse(request.get_data(cache=False), request.content_type)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        retry_after = _service().submit_flows(features, labels, rejected, addresses)
+    except RuntimeError as e:
+        return _unavailable(str(e))
+    if retry_after is not None:
+        response = jsonify({'success': False, 'error': 'Ingest queue full', 'retry_after': retry_after})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    
+    return jsonify({'success': True, 'accepted': len(features), 'rejected': rejected,
+                    'labelled': labels is not None}), 202
+
+def admin_only(view):
+    """Require X-Admin-Token to match AGISFL_ADMIN_TOKEN; without a token set the endpoint is disabled"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # No loopback fallback: behind a reverse proxy every client appears to come from localhost
+        token = os.environ.get('AGISFL_ADMIN_TOKEN')
+        if not token:
+            return jsonify({'error': 'Admin endpoints are disabled; set AGISFL_ADMIN_TOKEN to enable them'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), token.encode()):
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@api.route('/api/admin/profile/start', methods=['POST'])
+@admin_only
+def start_profile():
+    """Start sampling stacks: {'duration': s, 'interval': s, 'threads': [name prefixes], 'focus': [components]}"""
+    options = request.get_json(silent=True) or {}
+    try:
+        status = _service().start_profile(float(options.get('duration', 30.0)), float(options.get('interval', 0.005)),
+                                          options.get('threads'), list(options.get('focus', ())))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(status), 202
+
+@api.route('/api/admin/profile/stop', methods=['POST'])
+@admin_only
+def stop_profile():
+    return jsonify(_service().stop_profile())
+
+@api.route('/api/admin/profile')
+@admin_only
+def get_profile():
+    """Profiler session status: samples taken, distinct stacks and sampling overhead"""
+    return jsonify(_service().get_profile())
+
+@api.route('/api/admin/profile/collapsed')
+@admin_only
+def get_collapsed_profile():
+    """Sampled stacks in collapsed format, for flamegraph.pl or speedscope"""
+    return current_app.response_class(_service().get_collapsed_profile(), mimetype='text/plain')
+
+@api.route('/api/admin/memory/snapshot', methods=['POST'])
+@admin_only
+def memory_snapshot():
+    """Start tracemalloc if needed and take the baseline later diffs compare against"""
+    options = request.get_json(silent=True) or {}
+    return jsonify(_service().memory_snapshot(int(options.get('frames', 10))))
+
+@api.route('/api/admin/memory/diff')
+@admin_only
+def memory_diff():
+    """Top allocation growth since the baseline, grouped by lineno, filename or traceback"""
+    try:
+        return jsonify(_service().memory_diff(request.args.get('limit', 20, type=int),
+                                              request.args.get('group_by', 'lineno')))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/api/admin/memory/stop', methods=['POST'])
+@admin_only
+def stop_memory_tracing():
+    return jsonify(_service().stop_memory_tracing())
 
 # WebSocket events
-@socketio.on('connect')
 def handle_connect():
     logger.info('Client connected to WebSocket')
     emit('status', {'message': 'Connected to AgisFL'})
 
-@socketio.on('disconnect')
 def handle_disconnect():
+    _service().disconnect(request.sid)
     logger.info('Client disconnected from WebSocket')
 
-def signal_handler(sig, frame):
-    """Handle shutdown signals"""
-    logger.info('Shutting down AgisFL...')
-    stop_monitoring()
-    sys.exit(0)
+def handle_subscribe(message):
+    """Subscribe to streams: {'streams': [...], 'tier': 'realtime'|'normal'|'slow', 'encoding': 'json'|'msgpack'}"""
+    message = message or {}
+    try:
+        return _service().subscribe(request.sid, list(message.get('streams', STREAMS + EVENT_STREAMS)),
+                                    message.get('tier', 'normal'), message.get('encoding', 'json'))
+    except ValueError as e:
+        return {'error': str(e)}
+
+def handle_unsubscribe(message):
+    _service().unsubscribe(request.sid, (message or {}).get('streams'))
+
+def handle_resync(message):
+    """A client saw a sequence gap; resend it a keyframe"""
+    _service().resync(request.sid, (message or {}).get('stream'))
+
+def create_app(service=None, hub=None, message_queue: str = None, read_cache_ttl: float = 0.0):
+    """Build the Flask app and its Socket.IO server.
+    
+    Without a service, the app owns a new in-process AgisFLService (call its initialize()). Production workers
+    pass StateManager proxies for the owner's service and hub, or a Redis/AMQP message_queue URL instead of
+    the hub, and a read_cache_ttl so status and metrics reads are answered from worker memory.
+    """
+    app = Flask(__name__)
+    app.json = FLJSONProvider(app)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'agisfl-secret-key')
+    # Engine.IO sessions live in one worker; without sticky sessions, multi-worker clients must skip polling
+    app.config['SOCKETIO_TRANSPORTS'] = ['polling', 'websocket'] if service is None else ['websocket']
+    CORS(app)
+    
+    if message_queue:
+        socketio_server = SocketIO(app, cors_allowed_origins="*", message_queue=message_queue)
+    elif hub is not None:
+        socketio_server = SocketIO(app, cors_allowed_origins="*", client_manager=HubClientManager(hub))
+    else:
+        socketio_server = SocketIO(app, cors_allowed_origins="*")
+    
+    for event, handler in [('connect', handle_connect), ('disconnect', handle_disconnect),
+                           ('subscribe', handle_subscribe), ('unsubscribe', handle_unsubscribe),
+                           ('resync', handle_resync)]:
+        socketio_server.on_event(event, handler)
+    
+    app.extensions['agisfl'] = service if service is not None else AgisFLService(socketio_server.server)
+    app.extensions['agisfl_reads'] = SnapshotCache(read_cache_ttl) if read_cache_ttl > 0 else None
+    app.register_blueprint(api)
+    return app
+
+def _service():
+    return current_app.extensions['agisfl']
+
+def _unavailable(error: str):
+    """503 naming the readiness phase; Retry-After is set while the FL system is still initializing"""
+    phase = _service().get_readiness()['phase']
+    response = jsonify({'success': False, 'error': error, 'phase': phase})
+    if phase not in ('ready', 'failed', 'demo'):
+        response.headers['Retry-After'] = '5'
+    return response, 503
+
+def _read(key: str, loader):
+    """Read through the worker-local cache when one is configured"""
+    cache = current_app.extensions['agisfl_reads']
+    return cache.get(key, loader) if cache is not None else loader()
+
+def _flow_parser():
+    """Parse-only FlowIngestor for this app, built once the owner's feature schema is known"""
+    parser = current_app.extensions.get('agisfl_parser')
+    if parser is None and FL_CORE_AVAILABLE:
+        feature_names = _service().get_ingest_schema()
+        if feature_names:
+            parser = current_app.extensions['agisfl_parser'] = FlowIngestor(feature_names)
+    return parser
+
+class ProductionServer(BaseApplication):
+    """Gunicorn arbiter serving worker apps that share the owner process's FL state"""
+    
+    def __init__(self, address, authkey: bytes, options: dict, message_queue: str = None, read_cache_ttl: float = 1.0):
+        self.address = address
+        self.authkey = authkey
+        self.options = options
+        self.message_queue = message_queue
+        self.read_cache_ttl = read_cache_ttl
+        super().__init__()
+    
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+    
+    def load(self):
+        # Runs in each worker after the fork, so every worker opens its own IPC connections
+        manager = StateManager(address=self.address, authkey=self.authkey)
+        manager.connect()
+        return create_app(service=manager.service(), hub=None if self.message_queue else manager.hub(),
+                          message_queue=self.message_queue, read_cache_ttl=self.read_cache_ttl)
+
+def run_production(port: int):
+    """Start the FL owner process, then serve the API from several gunicorn workers"""
+    if not GUNICORN_AVAILABLE:
+        raise RuntimeError("Production mode requires gunicorn (pip install gunicorn)")
+    
+    message_queue = os.environ.get('AGISFL_MESSAGE_QUEUE')
+    authkey = os.urandom(32)
+    state_manager = StateManager(address=('127.0.0.1', 0), authkey=authkey)
+    # Returns once the owner is serving; the FL system keeps initializing there in the background, and
+    # until its readiness phase is 'ready' workers answer FL-backed routes with 503 and Retry-After
+    state_manager.start(_init_owner, (message_queue,))
+    logger.info(f"FL state owner running at {state_manager.address}")
+    
+    options = {
+        'bind': f'0.0.0.0:{port}',
+        'workers': int(os.environ.get('AGISFL_WORKERS', min(4, (os.cpu_count() or 1) + 1))),
+        'worker_class': os.environ.get('AGISFL_WORKER_CLASS', 'gthread'),  # Or eventlet/gevent when installed
+        'threads': int(os.environ.get('AGISFL_WORKER_THREADS', 32)),
+        'timeout': 120
+    }
+    try:
+        ProductionServer(state_manager.address, authkey, options, message_queue,
+                         read_cache_ttl=float(os.environ.get('AGISFL_WORKER_CACHE_TTL', 1.0))).run()
+    finally:
+        state_manager.service().shutdown()  # Flushes the pending checkpoint
+        state_manager.shutdown()
 
 if __name__ == '__main__':
+    # Get port from environment or use default
+    port = int(os.environ.get('PORT', 5001))
+    
+    if os.environ.get('AGISFL_MODE', 'production' if os.environ.get('NODE_ENV') == 'production' else 'dev') == 'production':
+        logger.info(f"Starting AgisFL production server on port {port}")
+        run_production(port)
+        sys.exit(0)
+    
+    app = create_app()
+    service = app.extensions['agisfl']
+    
+    def signal_handler(sig, frame):
+        """Handle shutdown signals"""
+        logger.info('Shutting down AgisFL...')
+        service.shutdown()  # Flushes the pending checkpoint
+        sys.exit(0)
+    
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
-    # Initialize the FL system
+    # Initialize the FL system in the background so the port opens immediately
     logger.info("Initializing AgisFL system...")
-    initialize_fl_system()
-    
-    # Get port from environment or use default
-    port = int(os.environ.get('PORT', 5001))
+    service.initialize(background=True)
     
     logger.info(f"Starting AgisFL server on port {port}")
     logger.info("Dashboard available at: http://localhost:5000")
     logger.info("Python interface available at: http://localhost:5001")
     
-    # Start the Flask-SocketIO server
-    socketio.run(
+    # Single-process development server; the reloader is off because it would start a second FL system
+    app.extensions['socketio'].run(
         app,
         host='0.0.0.0',
         port=port,
-        debug=os.environ.get('NODE_ENV') != 'production',
+        debug=os.environ.get('AGISFL_DEBUG') == '1',
+        use_reloader=False,
         allow_unsafe_werkzeug=True
-    )
\ No newline at end of file
+    )
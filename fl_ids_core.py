@@ -13,13 +13,20 @@ import logging
 import os
 import platform
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable
 import psutil
 import socket
 import struct
 from collections import defaultdict, deque
 import hashlib
+import functools
+import operator
 import secrets
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from fl_ids_metrics import Counter, Gauge, Histogram
 
 # Cross-platform network monitoring
 try:
@@ -29,6 +36,37 @@ except ImportError:
     SCAPY_AVAILABLE = False
     print("Warning: Scapy not available. Using system metrics instead of packet capture.")
 
+# Faster JSON parsing for bulk ingest when available
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Hot-path instrumentation, exposed by the app at /metrics
+ROUND_DURATION = Histogram('agisfl_round_duration_seconds', 'Wall time of a training round')
+ROUNDS_TOTAL = Counter('agisfl_training_rounds_total', 'Training rounds by outcome', ['outcome'])
+# Labelled by straggler status only: per-node series grow with the fleet, per-node latency lives in NodeLatencyTracker
+NODE_TRAINING_TIME = Histogram('agisfl_node_training_seconds', 'Local training time of one node update',
+                               ['straggler'])
+AGGREGATION_TIME = Histogram('agisfl_aggregation_seconds', 'Time spent aggregating one round of updates',
+                             ['method'])
+LATE_NODES_TOTAL = Counter('agisfl_late_node_updates_total', 'Node updates that missed the round deadline')
+BYZANTINE_SCREENING_TIME = Histogram('agisfl_byzantine_screening_seconds', 'Time to screen updates for Byzantine nodes')
+BYZANTINE_FLAGGED_TOTAL = Counter('agisfl_byzantine_flagged_updates_total', 'Updates flagged as Byzantine')
+SECURE_AGGREGATION_TIME = Histogram('agisfl_secure_aggregation_seconds', 'Secure aggregation time by operation',
+                                    ['operation'])
+METRICS_SAMPLING_TIME = Histogram('agisfl_system_metrics_sampling_seconds', 'Time to sample system metrics')
+CAPTURED_PACKETS_TOTAL = Counter('agisfl_captured_packets_total', 'Packets captured for analysis', ['source'])
+BLOCKED_PACKETS_TOTAL = Counter('agisfl_reputation_blocked_packets_total',
+                                'Captured packets matched by the IP reputation index')
+TRAFFIC_ALERTS_TOTAL = Counter('agisfl_traffic_alerts_total', 'Traffic sketch alerts by reason', ['reason'])
+INGEST_ROWS_TOTAL = Counter('agisfl_ingest_rows_total', 'Streamed flow rows by outcome', ['outcome'])
+INGEST_PARSE_TIME = Histogram('agisfl_ingest_parse_seconds', 'Time to parse and validate one ingest body',
+                              ['format'])
+INTERFACE_DROPS = Gauge('agisfl_interface_dropped_packets', 'Packets dropped by the network stack since boot',
+                        ['direction'])
+
 class NetworkDataGenerator:
     """Advanced network data generator with realistic attack patterns"""
     
@@ -106,6 +144,518 @@ class NetworkDataGenerator:
         data['label'] = labels
         return pd.DataFrame(data)
 
+def _mix64(keys: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Vectorized splitmix64 finalizer: well-mixed 64-bit hashes of integer keys"""
+    x = keys.astype(np.uint64) + np.uint64((0x9E3779B97F4A7C15 * (seed + 1)) & 0xFFFFFFFFFFFFFFFF)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+class BloomFilter:
+    """Packed-bit Bloom filter over uint32 keys with vectorized double hashing"""
+    
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.num_bits = max(64, int(np.ceil(-capacity * np.log(fp_rate) / np.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * np.log(2))))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+    
+    def _hashes(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # The two 32-bit halves seed Kirsch-Mitzenmacher double hashing
+        x = _mix64(keys)
+        return x & np.uint64(0xFFFFFFFF), (x >> np.uint64(32)) | np.uint64(1)
+    
+    def _positions(self, h1: np.ndarray, h2: np.ndarray, i: int) -> np.ndarray:
+        return (h1 + np.uint64(i) * h2) % np.uint64(self.num_bits)
+    
+    def add(self, keys: np.ndarray, chunk_size: int = 1 << 20):
+        """Insert keys in fixed-size chunks so hashing scratch stays bounded"""
+        for start in range(0, len(keys), chunk_size):
+            h1, h2 = self._hashes(keys[start:start + chunk_size])
+            for i in range(self.num_hashes):
+                positions = self._positions(h1, h2, i)
+                np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                                 (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+    
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """Membership mask; false positives at about fp_rate, never false negatives"""
+        h1, h2 = self._hashes(keys)
+        present = np.ones(len(keys), dtype=bool)
+        for i in range(self.num_hashes):
+            positions = self._positions(h1, h2, i)
+            present &= (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1 > 0
+        return present
+
+class IPReputationIndex:
+    """Known-bad IPv4 addresses and networks: sorted uint32 array, merged CIDR intervals, optional Bloom filter"""
+    
+    def __init__(self, bloom_fp_rate: Optional[float] = None, exact: bool = True):
+        self.bloom_fp_rate = bloom_fp_rate
+        # With a Bloom filter, exact=False drops the address array to save memory; address hits are then
+        # only probable and reported apart from confirmed ones (see lookup)
+        self.exact = exact
+        self.addresses = np.empty(0, dtype=np.uint32)
+        self.network_starts = np.empty(0, dtype=np.uint32)
+        self.network_ends = np.empty(0, dtype=np.uint32)
+        self.blooms = []  # One filter in exact mode; one per load in Bloom-only mode
+        self.num_addresses = 0
+    
+    @property
+    def bloom_only(self) -> bool:
+        return not self.exact and self.bloom_fp_rate is not None
+    
+    # Per-byte class codes summed per line: stray characters in bits 0-7, dots in 8-15, slashes in 16-23
+    _BYTE_CODES = np.ones(256, dtype=np.int32)
+    _BYTE_CODES[[ord(c) for c in '0123456789 \t\r\n']] = 0
+    _BYTE_CODES[ord('.')] = 1 << 8
+    _BYTE_CODES[ord('/')] = 1 << 16
+    
+    @classmethod
+    def parse_ipv4(cls, data: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Parse newline-separated IPv4 addresses or CIDR blocks without a Python loop per line.
+        
+        Text after '#' or ';' is ignored. Returns (address, prefix length, valid) arrays with one entry
+        per line; invalid lines have valid=False.
+        """
+        raw = np.frombuffer(data, dtype=np.uint8)
+        if not raw.size or raw[-1] != 10:
+            raw = np.append(raw, np.uint8(10))
+        newline_positions = np.flatnonzero(raw == 10)
+        num_lines = len(newline_positions)
+        line_starts = np.empty(num_lines, dtype=np.int64)
+        line_starts[0] = 0
+        line_starts[1:] = newline_positions[:-1] + 1
+        
+        # Blank out everything from the first comment character to the end of its line
+        comment_positions = np.flatnonzero((raw == ord('#')) | (raw == ord(';')))
+        if len(comment_positions):
+            comment_lines, first = np.unique(np.searchsorted(newline_positions, comment_positions),
+                                             return_index=True)
+            marks = np.zeros(len(raw) + 1, dtype=np.int8)
+            marks[comment_positions[first]] = 1
+            marks[newline_positions[comment_lines]] -= 1
+            raw = np.where(np.cumsum(marks[:-1], dtype=np.int8) > 0, np.uint8(ord(' ')), raw)
+        
+        # Digit runs are octets or the prefix length
+        digit = (raw >= ord('0')) & (raw <= ord('9'))
+        run_starts = np.flatnonzero(digit[1:] & ~digit[:-1]) + 1
+        if digit[0]:
+            run_starts = np.concatenate(([0], run_starts))
+        run_length = np.flatnonzero(digit[:-1] & ~digit[1:]) - run_starts + 1  # The last byte is a newline
+        runs_per_line = np.diff(np.searchsorted(run_starts, np.append(line_starts, len(raw))))
+        
+        # Lines longer than 255 bytes are rejected, so no per-line count overflows its 8-bit field
+        counts = np.add.reduceat(cls._BYTE_CODES[raw], line_starts)
+        line_length = newline_positions - line_starts
+        shaped = (((counts & 0xFF) == 0) & (((counts >> 8) & 0xFF) == 3) & (line_length < 256) &
+                  (((runs_per_line == 4) & ((counts >> 16) == 0)) | ((runs_per_line == 5) & ((counts >> 16) == 1))))
+        
+        # Decode every run from its first three bytes; longer runs are invalid anyway
+        padded = np.append(raw, np.zeros(2, dtype=np.uint8))
+        d0, d1, d2 = (padded[run_starts + place].astype(np.int32) - ord('0') for place in range(3))
+        run_values = np.where(run_length == 1, d0, np.where(run_length == 2, d0 * 10 + d1, d0 * 100 + d1 * 10 + d2))
+        preceding = raw[np.maximum(run_starts - 1, 0)]
+        
+        # Check the runs of well-shaped lines by position: octets 2-4 follow a dot, the prefix a slash
+        lines = np.flatnonzero(shaped)
+        first_run = (np.cumsum(runs_per_line) - runs_per_line)[lines]
+        ok = (preceding[first_run] != ord('.')) & (preceding[first_run] != ord('/')) | (run_starts[first_run] == 0)
+        address = np.zeros(len(lines), dtype=np.int64)
+        for index in range(4):
+            run = first_run + index
+            ok &= (run_length[run] <= 3) & (run_values[run] <= 255)
+            if index:
+                ok &= preceding[run] == ord('.')
+            address |= run_values[run].astype(np.int64) << (8 * (3 - index))
+        
+        prefixes = np.full(num_lines, 32, dtype=np.int64)
+        with_prefix = runs_per_line[lines] == 5
+        run = first_run[with_prefix] + 4
+        ok[with_prefix] &= (preceding[run] == ord('/')) & (run_length[run] <= 2) & (run_values[run] <= 32)
+        prefixes[lines[with_prefix]] = run_values[run]
+        
+        valid = np.zeros(num_lines, dtype=bool)
+        valid[lines] = ok
+        addresses = np.zeros(num_lines, dtype=np.uint32)
+        addresses[lines] = address
+        return addresses, prefixes, valid
+    
+    @classmethod
+    def to_uint32(cls, ips: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert dotted-quad strings (or pass through integers) to uint32 with a validity mask"""
+        if isinstance(ips, np.ndarray) and ips.dtype.kind in 'ui':
+            return ips.astype(np.uint32, copy=False), np.ones(len(ips), dtype=bool)
+        if not len(ips):
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=bool)
+        addresses, prefixes, valid = cls.parse_ipv4('\n'.join(map(str, ips)).encode('ascii', 'replace'))
+        return addresses, valid & (prefixes == 32)
+    
+    def _build(self, addresses: List[np.ndarray], starts: List[np.ndarray], ends: List[np.ndarray]):
+        """Merge new entries into the sorted address array and the merged interval list"""
+        if not self.bloom_only:
+            addresses = [self.addresses] + addresses
+        if addresses:
+            # Sort in place and drop neighbours; cheaper than np.unique for tens of millions of keys
+            merged = np.concatenate(addresses)
+            merged.sort()
+            keep = np.ones(len(merged), dtype=bool)
+            np.not_equal(merged[1:], merged[:-1], out=keep[1:])
+            self.addresses = merged[keep]
+        if self.bloom_only:
+            # Earlier loads only survive in their filters, so only keys they miss are new; a false
+            # positive makes a new key look like a repeat, so the count can run low by about fp_rate
+            self.addresses = self.addresses[~self._bloom_contains(self.addresses)]
+            self.num_addresses += len(self.addresses)
+        else:
+            self.num_addresses = len(self.addresses)
+        
+        starts = np.concatenate([self.network_starts.astype(np.int64)] + starts)
+        ends = np.concatenate([self.network_ends.astype(np.int64)] + ends)
+        if len(starts):
+            order = np.argsort(starts, kind='stable')
+            starts, ends = starts[order], ends[order]
+            reach = np.maximum.accumulate(ends)
+            # A network opens a new interval unless it overlaps or touches everything before it
+            opens = np.ones(len(starts), dtype=bool)
+            opens[1:] = starts[1:] > reach[:-1] + 1
+            closes = np.append(np.flatnonzero(opens)[1:] - 1, len(starts) - 1)
+            starts, ends = starts[opens], reach[closes]
+        self.network_starts = starts.astype(np.uint32)
+        self.network_ends = ends.astype(np.uint32)
+        
+        if self.bloom_fp_rate is not None and len(self.addresses):
+            if self.exact:
+                # Rebuilt from the full array so it is always sized for everything loaded
+                self.blooms = [BloomFilter(len(self.addresses), self.bloom_fp_rate)]
+            else:
+                # A Bloom filter cannot grow once its keys are gone, so each load gets its own filter
+                # sized for its new keys; halving fp_rate per filter keeps the overall rate under bloom_fp_rate
+                fp_rate = self.bloom_fp_rate / 2 ** (len(self.blooms) + 1)
+                self.blooms.append(BloomFilter(len(self.addresses), fp_rate))
+            self.blooms[-1].add(self.addresses)
+            if not self.exact:
+                self.addresses = np.empty(0, dtype=np.uint32)
+    
+    @staticmethod
+    def _split(addresses: np.ndarray, prefixes: np.ndarray, valid: np.ndarray):
+        """Split parsed entries into host addresses and (start, end) network intervals"""
+        hosts = valid & (prefixes == 32)
+        networks = valid & (prefixes < 32)
+        host_bits = (np.int64(1) << (32 - prefixes[networks])) - 1
+        starts = addresses[networks].astype(np.int64) & ~host_bits
+        return addresses[hosts], starts, starts + host_bits
+    
+    def add(self, entries: List[str]):
+        """Add addresses and CIDR blocks given as strings"""
+        addresses, prefixes, valid = self.parse_ipv4('\n'.join(entries).encode('ascii', 'replace'))
+        hosts, starts, ends = self._split(addresses, prefixes, valid)
+        self._build([hosts], [starts], [ends])
+    
+    def load_blocklist(self, path: str, chunk_bytes: int = 8 << 20) -> Dict[str, Any]:
+        """Load a one-entry-per-line blocklist, parsing it in chunks so scratch memory stays bounded"""
+        start_time = time.perf_counter()
+        hosts, starts, ends = [], [], []
+        loaded = skipped = 0
+        remainder = b''
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_bytes)
+                data = remainder + chunk
+                if chunk:
+                    cut = data.rfind(b'\n') + 1
+                    data, remainder = data[:cut], data[cut:]
+                if data:
+                    addresses, prefixes, valid = self.parse_ipv4(data)
+                    chunk_hosts, chunk_starts, chunk_ends = self._split(addresses, prefixes, valid)
+                    hosts.append(chunk_hosts)
+                    starts.append(chunk_starts)
+                    ends.append(chunk_ends)
+                    loaded += int(valid.sum())
+                    skipped += int((~valid).sum())
+                if not chunk:
+                    break
+        
+        self._build(hosts, starts, ends)
+        return {
+            'entries_loaded': loaded,
+            'lines_skipped': skipped,  # Blank, comment-only and malformed lines
+            'addresses': self.num_addresses,
+            'networks': len(self.network_starts),
+            'memory_bytes': self.memory_bytes(),
+            'load_time': time.perf_counter() - start_time
+        }
+    
+    def _bloom_contains(self, keys: np.ndarray) -> np.ndarray:
+        present = np.zeros(len(keys), dtype=bool)
+        for bloom in self.blooms:
+            present |= bloom.contains(keys)
+        return present
+    
+    def lookup(self, ips: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """(listed, probable) masks: listed addresses are confirmed by the address array or fall inside a
+        listed network; probable ones only passed a Bloom-only index's filters, so some are false positives"""
+        keys, valid = self.to_uint32(ips)
+        listed = np.zeros(len(keys), dtype=bool)
+        probable = np.zeros(len(keys), dtype=bool)
+        
+        if self.blooms:
+            candidates = np.flatnonzero(valid & self._bloom_contains(keys))
+        else:
+            candidates = np.flatnonzero(valid)
+        if not self.bloom_only and len(self.addresses):
+            # Sorted needles let each binary search start from the previous hit, which stays in cache
+            order = np.argsort(keys[candidates], kind='stable') if len(candidates) > 1024 else slice(None)
+            needles = keys[candidates][order]
+            position = np.minimum(np.searchsorted(self.addresses, needles), len(self.addresses) - 1)
+            listed[candidates[order]] = self.addresses[position] == needles
+        elif self.bloom_only:
+            probable[candidates] = True
+        
+        if len(self.network_starts):
+            interval = np.searchsorted(self.network_starts, keys, side='right') - 1
+            inside = (interval >= 0) & (keys <= self.network_ends[np.maximum(interval, 0)])
+            listed |= inside & valid
+        probable &= ~listed
+        return listed, probable
+    
+    def contains(self, ips: Any) -> np.ndarray:
+        """Mask of addresses that are confirmed listed or fall inside a listed network"""
+        return self.lookup(ips)[0]
+    
+    def lookup_flows(self, src: Any, dst: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """(listed, probable) masks of flows by their source or destination; see lookup"""
+        src_listed, src_probable = self.lookup(src)
+        dst_listed, dst_probable = self.lookup(dst)
+        listed = src_listed | dst_listed
+        return listed, (src_probable | dst_probable) & ~listed
+    
+    def match_flows(self, src: Any, dst: Any) -> np.ndarray:
+        """Mask of flows whose source or destination is confirmed known-bad"""
+        return self.lookup_flows(src, dst)[0]
+    
+    def memory_bytes(self) -> int:
+        return (self.addresses.nbytes + self.network_starts.nbytes + self.network_ends.nbytes +
+                sum(bloom.bits.nbytes for bloom in self.blooms))
+    
+    def __len__(self) -> int:
+        return self.num_addresses + len(self.network_starts)
+
+class CountMinSketch:
+    """Count-Min sketch over integer keys, split into time panes so queries cover a sliding window"""
+    
+    def __init__(self, width: int = 2048, depth: int = 4, panes: int = 1, seed: int = 0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.tables = np.zeros((panes, depth, width))
+        self.pane = 0
+    
+    def _buckets(self, keys: np.ndarray) -> np.ndarray:
+        return np.stack([_mix64(keys, self.seed + row) % np.uint64(self.width) for row in range(self.depth)])
+    
+    def add(self, keys: np.ndarray, weights: Optional[np.ndarray] = None):
+        """Add a batch of keys (with optional weights) to the current pane"""
+        table = self.tables[self.pane]
+        for row, buckets in enumerate(self._buckets(keys)):
+            table[row] += np.bincount(buckets.astype(np.intp), weights=weights, minlength=self.width)
+    
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        """Upper-bound estimates of each key's total across all panes"""
+        window = self.tables.sum(axis=0)
+        buckets = self._buckets(keys).astype(np.intp)
+        return window[np.arange(self.depth)[:, None], buckets].min(axis=0)
+    
+    def total(self) -> float:
+        """Total weight in the window (exact)"""
+        return float(self.tables[:, 0].sum())
+    
+    def advance(self, steps: int = 1):
+        """Move to the next pane, clearing the panes that fall out of the window"""
+        for _ in range(min(steps, len(self.tables))):
+            self.pane = (self.pane + 1) % len(self.tables)
+            self.tables[self.pane] = 0.0
+
+class DistinctCountSketch:
+    """Per-key HyperLogLog distinct counts in fixed memory: keys hash into a Count-Min style grid of
+    HLL register sets; each row's median slot is subtracted as collision noise and the minimum over rows is used"""
+    
+    def __init__(self, slots: int = 2048, depth: int = 3, precision: int = 6, panes: int = 1, seed: int = 0):
+        self.slots = slots
+        self.depth = depth
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.seed = seed
+        self.registers = np.zeros((panes, depth, slots, self.num_registers), dtype=np.uint8)
+        self.pane = 0
+        m = self.num_registers
+        self._alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    
+    def _slots(self, keys: np.ndarray) -> np.ndarray:
+        return np.stack([_mix64(keys, self.seed + row) % np.uint64(self.slots) for row in range(self.depth)])
+    
+    def add(self, keys: np.ndarray, items: np.ndarray):
+        """Record that each key was seen with the matching item"""
+        hashes = _mix64(items, self.seed + 1000)
+        register = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = hashes << np.uint64(self.precision)
+        # Rank = leading zeros of the remaining bits + 1, counted by binary search over bit widths
+        leading_zeros = np.zeros(len(rest), dtype=np.int64)
+        for width in (32, 16, 8, 4, 2, 1):
+            empty = rest < np.uint64(1 << (64 - width))
+            leading_zeros[empty] += width
+            rest[empty] <<= np.uint64(width)
+        leading_zeros[rest == 0] = 64
+        rank = np.minimum(leading_zeros + 1, 64 - self.precision + 1).astype(np.uint8)
+        
+        pane = self.registers[self.pane].reshape(-1)
+        for row, slots in enumerate(self._slots(keys)):
+            index = (row * self.slots + slots.astype(np.intp)) * self.num_registers + register
+            np.maximum.at(pane, index, rank)
+    
+    def _cardinality(self, registers: np.ndarray) -> np.ndarray:
+        m = self.num_registers
+        estimate = self._alpha * m * m / np.exp2(-registers.astype(np.float64)).sum(axis=-1)
+        zeros = (registers == 0).sum(axis=-1)
+        small = (estimate <= 2.5 * m) & (zeros > 0)
+        estimate[small] = m * np.log(m / zeros[small])  # Linear counting for small cardinalities
+        return estimate
+    
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        """Estimated distinct items per key across all panes"""
+        window = self.registers.max(axis=0)
+        slots = self._slots(keys).astype(np.intp)
+        estimate = self._cardinality(window[np.arange(self.depth)[:, None], slots])  # (depth, keys)
+        # Every slot is shared by ~keys/slots sources; the median slot is the collision noise floor
+        noise = np.median(self._cardinality(window), axis=1)
+        return np.maximum(estimate - noise[:, None], 0.0).min(axis=0)
+    
+    def noise_margin(self, z: float = 4.0) -> float:
+        """Robust z-sigma spread of slot cardinalities; estimates below it are indistinguishable from collisions"""
+        cardinality = self._cardinality(self.registers.max(axis=0))
+        deviation = np.abs(cardinality - np.median(cardinality, axis=1, keepdims=True))
+        return float(z * 1.4826 * np.median(deviation, axis=1).max())
+    
+    def advance(self, steps: int = 1):
+        """Move to the next pane, clearing the panes that fall out of the window"""
+        for _ in range(min(steps, len(self.registers))):
+            self.pane = (self.pane + 1) % len(self.registers)
+            self.registers[self.pane] = 0
+
+class TrafficSketchMonitor:
+    """Sliding-window heavy-hitter and scan detection over packet batches in fixed memory"""
+    
+    def __init__(self, window: float = 60.0, panes: int = 6, width: int = 4096, depth: int = 4,
+                 slots: int = 2048, top_k: int = 20, heavy_hitter_share: float = 0.1,
+                 min_packets: int = 1000, scan_ports: int = 100, sweep_hosts: int = 100):
+        self.window = window
+        self.pane_duration = window / panes
+        self.top_k = top_k
+        self.heavy_hitter_share = heavy_hitter_share  # Share of window packets from one source
+        self.min_packets = min_packets
+        self.scan_ports = scan_ports  # Distinct destination ports from one source
+        self.sweep_hosts = sweep_hosts  # Distinct destination hosts from one source
+        
+        self.packets = CountMinSketch(width, depth, panes, seed=1)
+        self.bytes = CountMinSketch(width, depth, panes, seed=2)
+        self.ports = DistinctCountSketch(slots, 3, panes=panes, seed=3)
+        self.hosts = DistinctCountSketch(slots, 3, panes=panes, seed=13)
+        
+        # Candidate sources ranked by volume and by fan-out; each list is capped at top_k
+        self._volume_candidates = np.empty(0, dtype=np.uint32)
+        self._fanout_candidates = np.empty(0, dtype=np.uint32)
+        self._pane_index = None
+        self.packets_seen = 0
+        self._lock = threading.Lock()
+    
+    def _advance_to(self, now: float):
+        pane_index = int(now // self.pane_duration)
+        if self._pane_index is not None and pane_index > self._pane_index:
+            steps = pane_index - self._pane_index
+            for sketch in (self.packets, self.bytes, self.ports, self.hosts):
+                sketch.advance(steps)
+        self._pane_index = pane_index if self._pane_index is None else max(self._pane_index, pane_index)
+    
+    @staticmethod
+    def _top(candidates: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+        if len(candidates) <= k:
+            return candidates
+        return candidates[np.argpartition(-scores, k - 1)[:k]]
+    
+    def update_arrays(self, src: np.ndarray, dst: np.ndarray, dport: np.ndarray, size: np.ndarray,
+                      now: Optional[float] = None):
+        """Fold a batch of flows given as uint32 addresses, ports and byte sizes into the current pane"""
+        with self._lock:
+            self._advance_to(time.time() if now is None else now)
+            src = src.astype(np.uint32, copy=False)
+            self.packets.add(src)
+            self.bytes.add(src, size.astype(np.float64))
+            self.ports.add(src, dport)
+            self.hosts.add(src, dst)
+            self.packets_seen += len(src)
+            
+            sources = np.unique(src) if len(src) <= 65536 else np.unique(src[::max(1, len(src) // 65536)])
+            volume = np.union1d(self._volume_candidates, sources)
+            self._volume_candidates = self._top(volume, self.packets.estimate(volume), self.top_k)
+            fanout = np.union1d(self._fanout_candidates, sources)
+            self._fanout_candidates = self._top(
+                fanout, np.maximum(self.ports.estimate(fanout), self.hosts.estimate(fanout)), self.top_k)
+    
+    def update(self, packets: List[Dict[str, Any]], now: Optional[float] = None):
+        """Fold captured packets (src, dst, dport, size) into the sketches"""
+        if not packets:
+            return
+        src, src_ok = IPReputationIndex.to_uint32([packet['src'] for packet in packets])
+        dst, dst_ok = IPReputationIndex.to_uint32([packet['dst'] for packet in packets])
+        valid = src_ok & dst_ok
+        dport = np.fromiter((packet.get('dport', 0) for packet in packets), dtype=np.int64, count=len(packets))
+        size = np.fromiter((packet.get('size', 0) for packet in packets), dtype=np.float64, count=len(packets))
+        self.update_arrays(src[valid], dst[valid], dport[valid], size[valid], now)
+    
+    @staticmethod
+    def _address(value: int) -> str:
+        return '.'.join(str((int(value) >> shift) & 255) for shift in (24, 16, 8, 0))
+    
+    def heavy_hitters(self) -> List[Dict[str, Any]]:
+        """Top sources by packets in the window, with estimated bytes and share"""
+        with self._lock:
+            candidates = self._volume_candidates
+            packets = self.packets.estimate(candidates)
+            sizes = self.bytes.estimate(candidates)
+            total = self.packets.total()
+        order = np.argsort(-packets)
+        return [{'src': self._address(candidates[i]), 'packets': int(packets[i]), 'bytes': int(sizes[i]),
+                 'share': float(packets[i] / total) if total else 0.0} for i in order]
+    
+    def scanners(self) -> List[Dict[str, Any]]:
+        """Top sources by distinct destination ports or hosts in the window"""
+        with self._lock:
+            candidates = self._fanout_candidates
+            ports = self.ports.estimate(candidates)
+            hosts = self.hosts.estimate(candidates)
+        order = np.argsort(-np.maximum(ports, hosts))
+        return [{'src': self._address(candidates[i]), 'distinct_ports': int(round(ports[i])),
+                 'distinct_hosts': int(round(hosts[i]))} for i in order]
+    
+    def detect(self) -> List[Dict[str, Any]]:
+        """Alerts for heavy hitters, port scans and host sweeps in the current window"""
+        alerts = []
+        for hitter in self.heavy_hitters():
+            if hitter['packets'] >= self.min_packets and hitter['share'] >= self.heavy_hitter_share:
+                alerts.append(dict(hitter, reason='heavy_hitter'))
+        with self._lock:
+            scan_ports = self.scan_ports + self.ports.noise_margin()
+            sweep_hosts = self.sweep_hosts + self.hosts.noise_margin()
+        for scanner in self.scanners():
+            if scanner['distinct_ports'] >= scan_ports:
+                alerts.append(dict(scanner, reason='port_scan'))
+            elif scanner['distinct_hosts'] >= sweep_hosts:
+                alerts.append(dict(scanner, reason='host_sweep'))
+        return alerts
+    
+    def memory_bytes(self) -> int:
+        return (self.packets.tables.nbytes + self.bytes.tables.nbytes +
+                self.ports.registers.nbytes + self.hosts.registers.nbytes)
+
 class RealTimeSystemMonitor:
     """Real-time system and network monitoring"""
     
@@ -114,6 +664,9 @@ class RealTimeSystemMonitor:
         self.network_data = deque(maxlen=1000)
         self.monitoring = False
         self.interfaces = self._get_network_interfaces()
+        self.reputation = None  # Optional IPReputationIndex screening captured traffic
+        self.traffic_sketch = TrafficSketchMonitor()
+        self.alerts = deque(maxlen=1000)
         
     def _get_network_interfaces(self):
         """Get available network interfaces cross-platform"""
@@ -137,6 +690,10 @@ class RealTimeSystemMonitor:
     
     def get_system_metrics(self) -> Dict[str, Any]:
         """Get comprehensive system metrics"""
+        with METRICS_SAMPLING_TIME.time():
+            return self._sample_system_metrics()
+    
+    def _sample_system_metrics(self) -> Dict[str, Any]:
         try:
             cpu_percent = psutil.cpu_percent(interval=1)
             memory = psutil.virtual_memory()
@@ -144,6 +701,8 @@ class RealTimeSystemMonitor:
             
             # Network I/O statistics
             net_io = psutil.net_io_counters()
+            INTERFACE_DROPS.labels('in').set(net_io.dropin)
+            INTERFACE_DROPS.labels('out').set(net_io.dropout)
             
             # Process information
             processes = []
@@ -191,15 +750,62 @@ class RealTimeSystemMonitor:
             logging.error(f"Error getting system metrics: {e}")
             return {'error': str(e)}
     
+    def load_reputation(self, path: str, **kwargs) -> Dict[str, Any]:
+        """Load a blocklist into a fresh IPReputationIndex and start screening traffic with it"""
+        index = IPReputationIndex(**kwargs)
+        stats = index.load_blocklist(path)
+        self.reputation = index
+        return stats
+    
+    def screen_packets(self, packets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Divert packets from or to known-bad addresses into alerts and return the rest"""
+        if self.reputation is None or not packets:
+            return packets
+        
+        known_bad, probable = self.reputation.lookup_flows([packet['src'] for packet in packets],
+                                                           [packet['dst'] for packet in packets])
+        for index in np.flatnonzero(known_bad):
+            self.alerts.append(dict(packets[index], reason='ip_reputation'))
+        # Bloom-only hits may be false positives: alert on them but let the packets through
+        for index in np.flatnonzero(probable):
+            self.alerts.append(dict(packets[index], reason='ip_reputation_probable'))
+        BLOCKED_PACKETS_TOTAL.inc(int(known_bad.sum()))
+        return [packet for packet, bad in zip(packets, known_bad) if not bad]
+    
+    def _process_capture(self, packets: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+        """Fold a capture into the traffic sketches, raise volume/scan alerts and screen known-bad hosts"""
+        CAPTURED_PACKETS_TOTAL.labels(source).inc(len(packets))
+        try:
+            self.traffic_sketch.update(packets)
+            for alert in self.traffic_sketch.detect():
+                TRAFFIC_ALERTS_TOTAL.labels(alert['reason']).inc()
+                self.alerts.append(alert)
+        except Exception as e:
+            logging.error(f"Traffic sketch error: {e}")
+        return self.screen_packets(packets)
+    
+    def get_traffic_summary(self) -> Dict[str, Any]:
+        """Sliding-window heavy hitters, scanners and recent alerts"""
+        return {
+            'window_seconds': self.traffic_sketch.window,
+            'packets_seen': self.traffic_sketch.packets_seen,
+            'heavy_hitters': self.traffic_sketch.heavy_hitters(),
+            'scanners': self.traffic_sketch.scanners(),
+            'sketch_memory_bytes': self.traffic_sketch.memory_bytes(),
+            'recent_alerts': list(self.alerts)[-20:]
+        }
+    
     def capture_network_packets(self, interface: str = None, duration: int = 10):
         """Capture network packets for analysis"""
         if not SCAPY_AVAILABLE:
-            return self._simulate_packet_data(duration)
+            return self._process_capture(self._simulate_packet_data(duration), 'simulated')
         
         try:
             packets = []
             
             def packet_handler(packet):
+                transport = packet[scapy.TCP] if packet.haslayer(scapy.TCP) else \
+                    packet[scapy.UDP] if packet.haslayer(scapy.UDP) else None
                 packet_info = {
                     'timestamp': time.time(),
                     'src': packet[scapy.IP].src if packet.haslayer(scapy.IP) else 'unknown',
@@ -207,15 +813,17 @@ class RealTimeSystemMonitor:
                     'protocol': packet.proto if packet.haslayer(scapy.IP) else 0,
                     'size': len(packet),
                     'flags': packet.sprintf("%TCP.flags%") if packet.haslayer(scapy.TCP) else '',
+                    'sport': transport.sport if transport is not None else 0,
+                    'dport': transport.dport if transport is not None else 0,
                 }
                 packets.append(packet_info)
             
             scapy.sniff(iface=interface, prn=packet_handler, timeout=duration, store=0)
-            return packets
+            return self._process_capture(packets, 'live')
             
         except Exception as e:
             logging.error(f"Packet capture error: {e}")
-            return self._simulate_packet_data(duration)
+            return self._process_capture(self._simulate_packet_data(duration), 'simulated')
     
     def _simulate_packet_data(self, duration: int):
         """Simulate packet data when real capture isn't available"""
@@ -229,7 +837,9 @@ class RealTimeSystemMonitor:
                 'dst': f"10.0.{np.random.randint(1,255)}.{np.random.randint(1,255)}",
                 'protocol': np.random.choice([6, 17, 1]),  # TCP, UDP, ICMP
                 'size': np.random.randint(64, 1500),
-                'flags': np.random.choice(['S', 'A', 'F', 'R', 'P', ''])
+                'flags': np.random.choice(['S', 'A', 'F', 'R', 'P', '']),
+                'sport': np.random.randint(1024, 65536),
+                'dport': np.random.choice([80, 443, 22, 53, 25, 3389, 8080])
             }
             packets.append(packet)
         
@@ -265,6 +875,10 @@ class SecureAggregation:
     
     def encrypt_gradients(self, gradients: np.ndarray, node_id: str) -> bytes:
         """Encrypt gradients using simple XOR (demo implementation)"""
+        with SECURE_AGGREGATION_TIME.labels('encrypt').time():
+            return self._xor_encrypt(gradients, node_id)
+    
+    def _xor_encrypt(self, gradients: np.ndarray, node_id: str) -> bytes:
         if node_id not in self.keys:
             self.generate_keys(node_id)
         
@@ -280,6 +894,10 @@ class SecureAggregation:
     
     def aggregate_secure(self, encrypted_gradients: List[bytes]) -> np.ndarray:
         """Securely aggregate encrypted gradients"""
+        with SECURE_AGGREGATION_TIME.labels('aggregate').time():
+            return self._xor_aggregate(encrypted_gradients)
+    
+    def _xor_aggregate(self, encrypted_gradients: List[bytes]) -> np.ndarray:
         # Decrypt and aggregate (simplified for demo)
         total_gradients = None
         
@@ -312,6 +930,12 @@ class ByzantineFaultTolerance:
         if len(node_updates) < 3:
             return []
         
+        with BYZANTINE_SCREENING_TIME.time():
+            byzantine_nodes = self._screen(node_updates)
+        BYZANTINE_FLAGGED_TOTAL.inc(len(byzantine_nodes))
+        return byzantine_nodes
+    
+    def _screen(self, node_updates: Dict[str, np.ndarray]) -> List[str]:
         byzantine_nodes = []
         updates = list(node_updates.values())
         node_ids = list(node_updates.keys())
@@ -348,31 +972,771 @@ class ByzantineFaultTolerance:
         
         return np.mean(list(clean_updates.values()), axis=0)
 
+class UpdateCompressor:
+    """Top-k sparsification and per-tensor int8/uint8 quantization with error feedback"""
+
+    METHODS = ('topk', 'int8', 'uint8')
+
+    def __init__(self, method: str = 'topk', ratio: float = 0.01, error_feedback: bool = True):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown compression method: {method}")
+
+        self.method = method
+        self.ratio = ratio
+        self.error_feedback = error_feedback
+        self.residual = None
+
+    def compress(self, gradients: np.ndarray) -> Dict[str, Any]:
+        """Compress a dense update, carrying what was not transmitted into the next round"""
+        dense = np.asarray(gradients)
+        flat = dense.astype(np.float64).ravel()
+        if self.error_feedback and self.residual is not None and self.residual.shape == flat.shape:
+            flat += self.residual
+
+        if self.method == 'topk':
+            k = max(1, min(flat.size, int(flat.size * self.ratio)))
+            indices = np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:]
+            indices.sort()
+            payload = {
+                'encoding': 'topk',
+                'indices': indices.astype(np.int32),
+                'values': flat[indices].astype(np.float32)
+            }
+        elif self.method == 'int8':
+            peak = float(np.max(np.abs(flat))) if flat.size else 0.0
+            scale = peak / 127.0 if peak > 0 else 1.0
+            payload = {
+                'encoding': 'int8',
+                'q': np.clip(np.rint(flat / scale), -127, 127).astype(np.int8),
+                'scale': scale
+            }
+        else:
+            low = float(flat.min()) if flat.size else 0.0
+            high = float(flat.max()) if flat.size else 0.0
+            scale = (high - low) / 255.0 if high > low else 1.0
+            payload = {
+                'encoding': 'uint8',
+                'q': np.clip(np.rint((flat - low) / scale), 0, 255).astype(np.uint8),
+                'scale': scale,
+                'zero_point': low
+            }
+
+        payload['size'] = flat.size
+        payload['dense_nbytes'] = dense.nbytes
+
+        if self.error_feedback:
+            # Whatever the receiver will not reconstruct is re-added to the next update
+            flat -= self.decompress(payload)
+            self.residual = flat
+
+        return payload
+
+    @staticmethod
+    def payload_nbytes(payload: Dict[str, Any]) -> int:
+        """Bytes a compressed payload occupies on the wire"""
+        if payload['encoding'] == 'topk':
+            return payload['indices'].nbytes + payload['values'].nbytes
+        return payload['q'].nbytes + 16  # Quantized values plus scale and zero point
+
+    @staticmethod
+    def decompress(payload: Dict[str, Any]) -> np.ndarray:
+        """Reconstruct a dense float64 update from a compressed payload"""
+        dense = np.zeros(payload['size'], dtype=np.float64)
+        UpdateCompressor.accumulate(dense, payload, 1.0)
+        return dense
+
+    @staticmethod
+    def accumulate(total: np.ndarray, update: Any, weight: float = 1.0,
+                   scratch: Optional[np.ndarray] = None):
+        """Add weight * update into total in place without densifying compressed payloads"""
+        if not isinstance(update, dict):
+            update = np.asarray(update).ravel()
+            if update.shape != total.shape:
+                raise ValueError(f"Update size {update.size} does not match aggregate size {total.size}")
+            if scratch is None:
+                total += update * weight
+            else:
+                np.multiply(update, weight, out=scratch)
+                total += scratch
+            return
+
+        if update['size'] != total.size:
+            raise ValueError(f"Update size {update['size']} does not match aggregate size {total.size}")
+
+        if update['encoding'] == 'topk':
+            # Indices are unique, so fancy-index accumulation touches only k entries
+            total[update['indices']] += update['values'] * weight
+            return
+
+        if scratch is None:
+            total += update['q'] * (update['scale'] * weight)
+        else:
+            np.multiply(update['q'], update['scale'] * weight, out=scratch)
+            total += scratch
+        if update['encoding'] == 'uint8':
+            total += update['zero_point'] * weight
+
+class WeightedUpdateAccumulator:
+    """Running weighted sum of dense or compressed updates with O(params) memory"""
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size
+        self.total = None
+        self.total_weight = 0.0
+        self.count = 0
+        self._scratch = None
+
+    def add(self, update: Any, weight: float):
+        """Fold weight * update into the float64 running sum in place"""
+        size = update['size'] if isinstance(update, dict) else np.size(update)
+        if self.size is None:
+            self.size = size
+        if size != self.size:
+            raise ValueError(f"Update size {size} does not match model size {self.size}")
+
+        if self.total is None:
+            self.total = np.zeros(self.size, dtype=np.float64)
+            self._scratch = np.empty(self.size, dtype=np.float64)
+
+        UpdateCompressor.accumulate(self.total, update, weight, self._scratch)
+        self.total_weight += weight
+        self.count += 1
+
+    def result(self) -> np.ndarray:
+        """Get the weighted mean of everything folded so far"""
+        if not self.count or self.total_weight <= 0:
+            raise ValueError("No weighted updates to aggregate")
+        return self.total / self.total_weight
+
+class ServerOptimizer:
+    """FedOpt-style server optimizer: treats the averaged client model minus the global model as a
+    pseudo-gradient; optimizer state is allocated once and updated in place"""
+    
+    def __init__(self, learning_rate: float = 1.0):
+        self.learning_rate = learning_rate
+        self.steps = 0
+        self._delta = None
+    
+    def _allocate(self, size: int):
+        """Allocate per-parameter state; subclasses add their moment buffers"""
+        self._delta = np.empty(size, dtype=np.float64)
+    
+    def reset(self):
+        """Forget all optimizer state, e.g. after the model shape changes"""
+        self.steps = 0
+        self._delta = None
+    
+    def step(self, model: np.ndarray, aggregate: np.ndarray) -> np.ndarray:
+        """Move model toward the aggregate; the result is written into aggregate, which must be owned by
+        the caller, so readers of the current model never see it change"""
+        if self._delta is None or self._delta.size != aggregate.size:
+            self._allocate(aggregate.size)
+        delta = np.subtract(aggregate, model, out=self._delta)
+        direction = self._direction(delta)
+        np.multiply(direction, self.learning_rate, out=aggregate)
+        aggregate += model
+        self.steps += 1
+        return aggregate
+    
+    def _direction(self, delta: np.ndarray) -> np.ndarray:
+        return delta
+    
+    def state(self) -> Dict[str, np.ndarray]:
+        """Optimizer state arrays for checkpointing"""
+        return {'steps': np.array(self.steps)}
+    
+    def load_state(self, state: Dict[str, np.ndarray]):
+        """Restore state saved by state()"""
+        self.steps = int(state['steps'])
+
+class FedAvgM(ServerOptimizer):
+    """Server momentum: m = beta * m + delta; x += lr * m"""
+    
+    def __init__(self, learning_rate: float = 1.0, momentum: float = 0.9):
+        super().__init__(learning_rate)
+        self.momentum = momentum
+        self.velocity = None
+    
+    def _allocate(self, size: int):
+        super()._allocate(size)
+        self.velocity = np.zeros(size, dtype=np.float64)
+    
+    def reset(self):
+        super().reset()
+        self.velocity = None
+    
+    def _direction(self, delta: np.ndarray) -> np.ndarray:
+        self.velocity *= self.momentum
+        self.velocity += delta
+        return self.velocity
+    
+    def state(self) -> Dict[str, np.ndarray]:
+        return {**super().state(), 'velocity': self.velocity}
+    
+    def load_state(self, state: Dict[str, np.ndarray]):
+        super().load_state(state)
+        self._allocate(state['velocity'].size)
+        self.velocity[:] = state['velocity']
+
+class FedAdam(ServerOptimizer):
+    """Adaptive server optimizer (Reddi et al., Adaptive Federated Optimization) with Adam's second moment"""
+    
+    def __init__(self, learning_rate: float = 0.1, beta1: float = 0.9, beta2: float = 0.99, tau: float = 1e-3):
+        super().__init__(learning_rate)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.tau = tau  # Adaptivity floor; also the initial sqrt of the second moment
+        self.first_moment = None
+        self.second_moment = None
+        self._square = None
+    
+    def _allocate(self, size: int):
+        super()._allocate(size)
+        self.first_moment = np.zeros(size, dtype=np.float64)
+        self.second_moment = np.full(size, self.tau ** 2, dtype=np.float64)
+        self._square = np.empty(size, dtype=np.float64)
+    
+    def reset(self):
+        super().reset()
+        self.first_moment = self.second_moment = self._square = None
+    
+    def _update_second_moment(self, square: np.ndarray, scratch: np.ndarray):
+        self.second_moment *= self.beta2
+        square *= 1.0 - self.beta2
+        self.second_moment += square
+    
+    def _direction(self, delta: np.ndarray) -> np.ndarray:
+        self.first_moment *= self.beta1
+        np.multiply(delta, 1.0 - self.beta1, out=self._square)
+        self.first_moment += self._square
+        
+        # From here on delta is only needed squared, so its buffer serves as scratch and step direction
+        np.square(delta, out=self._square)
+        self._update_second_moment(self._square, delta)
+        np.sqrt(self.second_moment, out=delta)
+        delta += self.tau
+        return np.divide(self.first_moment, delta, out=delta)
+    
+    def state(self) -> Dict[str, np.ndarray]:
+        return {**super().state(), 'first_moment': self.first_moment, 'second_moment': self.second_moment}
+    
+    def load_state(self, state: Dict[str, np.ndarray]):
+        super().load_state(state)
+        self._allocate(state['first_moment'].size)
+        self.first_moment[:] = state['first_moment']
+        self.second_moment[:] = state['second_moment']
+
+class FedYogi(FedAdam):
+    """FedAdam with Yogi's additive second moment update, which grows the effective step more cautiously"""
+    
+    def _update_second_moment(self, square: np.ndarray, scratch: np.ndarray):
+        # v -= (1 - beta2) * delta^2 * sign(v - delta^2)
+        np.subtract(self.second_moment, square, out=scratch)
+        square *= np.sign(scratch, out=scratch)
+        square *= 1.0 - self.beta2
+        self.second_moment -= square
+
+SERVER_OPTIMIZERS = {'fedavgm': FedAvgM, 'fedadam': FedAdam, 'fedyogi': FedYogi}
+
+class UpdateWireFormat:
+    """Versioned binary envelope for node updates: fixed header followed by raw array buffers"""
+
+    MAGIC = b'FLUP'
+    VERSION = 1
+    # magic, version, encoding, dtype, ndim, node id length, reserved,
+    # round, data_size, size, nnz, accuracy, loss, timestamp, scale, zero point
+    HEADER = struct.Struct('<4sBBBBHHqqqqddddd')
+    ENCODINGS = {'dense': 0, 'topk': 1, 'int8': 2, 'uint8': 3}
+    DTYPES = {'<f8': 1, '<f4': 2, '<f2': 3, '|i1': 4, '|u1': 5, '<i4': 6, '<i8': 7}
+
+    @classmethod
+    def encode_parts(cls, update: Dict[str, Any], round_num: Optional[int] = None) -> List[Any]:
+        """Encode an update as [header, *buffers] for scatter writes without copying array data"""
+        node_id = str(update['node_id']).encode('utf-8')
+        timestamp = update.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+
+        payload = update.get('compressed')
+        if payload is None:
+            array = np.ascontiguousarray(update['gradients'])
+            encoding, scale, zero_point = 'dense', 0.0, 0.0
+            size, nnz, shape = array.size, array.size, array.shape
+            buffers = [array]
+        elif payload['encoding'] == 'topk':
+            array = np.ascontiguousarray(payload['values'])
+            encoding, scale, zero_point = 'topk', 0.0, 0.0
+            size, nnz, shape = payload['size'], array.size, (payload['size'],)
+            buffers = [np.ascontiguousarray(payload['indices'], dtype=np.int32), array]
+        else:
+            array = np.ascontiguousarray(payload['q'])
+            encoding = payload['encoding']
+            scale, zero_point = payload['scale'], payload.get('zero_point', 0.0)
+            size, nnz, shape = payload['size'], array.size, (payload['size'],)
+            buffers = [array]
+
+        header = bytearray(cls.HEADER.size + 8 * len(shape) + len(node_id))
+        cls.HEADER.pack_into(
+            header, 0, cls.MAGIC, cls.VERSION, cls.ENCODINGS[encoding], cls.DTYPES[array.dtype.str],
+            len(shape), len(node_id), 0,
+            update.get('round', 0) if round_num is None else round_num, update['data_size'], size, nnz,
+            update['accuracy'], update['loss'], timestamp or 0.0, scale, zero_point
+        )
+        struct.pack_into(f'<{len(shape)}q', header, cls.HEADER.size, *shape)
+        header[cls.HEADER.size + 8 * len(shape):] = node_id
+        header += b'\0' * (-len(header) % 8)  # Keep array buffers 8-byte aligned
+
+        return [header] + [memoryview(buffer).cast('B') for buffer in buffers]
+
+    @classmethod
+    def dense_size(cls, node_id: str, num_params: int, itemsize: int = 8, ndim: int = 1) -> int:
+        """Envelope bytes of a dense update, without building one; compressed encodings are never larger"""
+        header = cls.HEADER.size + 8 * ndim + len(str(node_id).encode('utf-8'))
+        return header + (-header % 8) + num_params * itemsize
+
+    @classmethod
+    def encode(cls, update: Dict[str, Any], round_num: Optional[int] = None) -> bytes:
+        """Encode an update into one contiguous buffer (a single copy of the array data)"""
+        return b''.join(cls.encode_parts(update, round_num))
+
+    @classmethod
+    def decode(cls, data: Any) -> Dict[str, Any]:
+        """Decode an update; arrays are zero-copy views into the given buffer"""
+        view = memoryview(data)
+        (magic, version, encoding, dtype_code, ndim, id_length, _, round_num, data_size,
+         size, nnz, accuracy, loss, timestamp, scale, zero_point) = cls.HEADER.unpack_from(view, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("Not an FL update envelope")
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported update envelope version: {version}")
+
+        offset = cls.HEADER.size
+        shape = struct.unpack_from(f'<{ndim}q', view, offset)
+        offset += 8 * ndim
+        node_id = bytes(view[offset:offset + id_length]).decode('utf-8')
+        offset += id_length
+        offset += -offset % 8
+
+        dtypes = {code: np.dtype(name) for name, code in cls.DTYPES.items()}
+        encodings = {code: name for name, code in cls.ENCODINGS.items()}
+        encoding = encodings[encoding]
+        dtype = dtypes[dtype_code]
+
+        update = {
+            'node_id': node_id,
+            'round': round_num,
+            'accuracy': accuracy,
+            'loss': loss,
+            'data_size': data_size,
+            'timestamp': datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+        }
+
+        if encoding == 'dense':
+            update['gradients'] = np.frombuffer(view, dtype=dtype, count=nnz, offset=offset).reshape(shape)
+        elif encoding == 'topk':
+            indices = np.frombuffer(view, dtype=np.int32, count=nnz, offset=offset)
+            values = np.frombuffer(view, dtype=dtype, count=nnz, offset=offset + indices.nbytes)
+            update['compressed'] = {'encoding': 'topk', 'indices': indices, 'values': values,
+                                    'size': size, 'dense_nbytes': size * 8}
+        else:
+            update['compressed'] = {'encoding': encoding, 'scale': scale, 'size': size, 'dense_nbytes': size * 8,
+                                    'q': np.frombuffer(view, dtype=dtype, count=nnz, offset=offset)}
+            if encoding == 'uint8':
+                update['compressed']['zero_point'] = zero_point
+
+        return update
+
+class TrainingHistory:
+    """Bounded training history: full detail for recent rounds, columnar arrays for the long tail"""
+
+    COLUMNS = ('round', 'accuracy', 'loss', 'samples')
+
+    def __init__(self, recent_rounds: int = 50, capacity: int = 100000):
+        self.recent = deque(maxlen=recent_rounds)
+        self.capacity = capacity
+        self.total_recorded = 0
+        self._size = min(64, capacity)
+        self._columns = {
+            'round': np.zeros(self._size, dtype=np.int64),
+            'accuracy': np.zeros(self._size, dtype=np.float64),
+            'loss': np.zeros(self._size, dtype=np.float64),
+            'samples': np.zeros(self._size, dtype=np.int64)
+        }
+        self._next = 0
+        self._count = 0
+
+    def append(self, round_num: int, accuracy: float, loss: float, samples: int,
+               detail: Optional[Dict[str, Any]] = None):
+        """Record one round; detail is kept only while it is among the recent rounds"""
+        if self._count == self._size and self._size < self.capacity:
+            self._grow()
+
+        i = self._next
+        self._columns['round'][i] = round_num
+        self._columns['accuracy'][i] = accuracy
+        self._columns['loss'][i] = loss
+        self._columns['samples'][i] = samples
+
+        self._next = (i + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+        self.total_recorded += 1
+
+        if detail is not None:
+            self.recent.append(detail)
+
+    def _grow(self):
+        """Double the columnar storage (only while still below capacity, so data is unwrapped)"""
+        new_size = min(self._size * 2, self.capacity)
+        for name, column in self._columns.items():
+            grown = np.zeros(new_size, dtype=column.dtype)
+            grown[:self._count] = column[:self._count]
+            self._columns[name] = grown
+        self._size = new_size
+        self._next = self._count
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Get the most recent detailed round record"""
+        return self.recent[-1] if self.recent else None
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        """Get the last n detailed round records in chronological order"""
+        records = []
+        for record in reversed(self.recent):
+            if len(records) >= n:
+                break
+            records.append(record)
+        records.reverse()
+        return records
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Get the retained long-tail columns in chronological order"""
+        if self._count < self._size:
+            return {name: column[:self._count] for name, column in self._columns.items()}
+
+        start = self._next
+        return {name: np.concatenate((column[start:], column[:start]))
+                for name, column in self._columns.items()}
+
+    def restore(self, columns: Dict[str, np.ndarray], records: List[Dict[str, Any]]):
+        """Reload long-tail columns and recent records saved by a checkpoint"""
+        count = min(len(columns['round']), self.capacity)
+        self._size = max(min(64, self.capacity), count)
+        for name in self.COLUMNS:
+            column = np.zeros(self._size, dtype=self._columns[name].dtype)
+            column[:count] = columns[name][len(columns[name]) - count:]
+            self._columns[name] = column
+        self._count = count
+        self._next = count % self._size
+        self.total_recorded = int(columns['round'][-1]) if count else 0
+
+        self.recent.clear()
+        self.recent.extend(records)
+
+    def __len__(self) -> int:
+        return len(self.recent)
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.recent)[index]
+        return self.recent[index]
+
+class TrainingDataWindow:
+    """Fixed-capacity columnar ring buffer of training rows with sliding-window or reservoir retention"""
+
+    def __init__(self, capacity: int, feature_names: List[str], retention: str = 'sliding',
+                 dtype=np.float32, seed: Optional[int] = None):
+        if retention not in ('sliding', 'reservoir'):
+            raise ValueError(f"Unknown retention policy: {retention}")
+
+        self.capacity = capacity
+        self.feature_names = list(feature_names)
+        self.retention = retention
+        self.dtype = dtype
+        self.rng = np.random.default_rng(seed)
+
+        # Sliding windows mirror every row at i and i + capacity so the newest rows are always contiguous
+        rows = 2 * capacity if retention == 'sliding' else capacity
+        self._features = np.zeros((rows, len(self.feature_names)), dtype=dtype, order='F')
+        self._labels = np.zeros(rows, dtype=dtype)
+        self._next = 0
+        self.count = 0
+        self.total_seen = 0
+        self._lock = threading.Lock()  # Appends may come from an ingest thread while training reads
+
+    def append(self, features: np.ndarray, labels: np.ndarray):
+        """Append a batch of rows in O(batch)"""
+        features = np.asarray(features)
+        labels = np.asarray(labels)
+        if features.ndim != 2 or features.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} feature columns, got shape {features.shape}")
+        if len(labels) != len(features):
+            raise ValueError("Feature and label batch lengths differ")
+
+        with self._lock:
+            if self.retention == 'sliding':
+                self._append_sliding(features, labels)
+            else:
+                self._append_reservoir(features, labels)
+            self.total_seen += len(features)
+
+    def _append_sliding(self, features: np.ndarray, labels: np.ndarray):
+        """Overwrite the oldest rows, keeping only the last capacity rows of oversized batches"""
+        if len(features) > self.capacity:
+            features = features[-self.capacity:]
+            labels = labels[-self.capacity:]
+
+        batch = len(features)
+        first = min(batch, self.capacity - self._next)
+        rest = batch - first
+        for offset in (0, self.capacity):
+            start = self._next + offset
+            self._features[start:start + first] = features[:first]
+            self._labels[start:start + first] = labels[:first]
+            if rest:
+                self._features[offset:offset + rest] = features[first:]
+                self._labels[offset:offset + rest] = labels[first:]
+
+        self._next = (self._next + batch) % self.capacity
+        self.count = min(self.count + batch, self.capacity)
+
+    def _append_reservoir(self, features: np.ndarray, labels: np.ndarray):
+        """Vectorized Algorithm R: fill to capacity, then replace with probability capacity / seen"""
+        fill = min(len(features), self.capacity - self.count)
+        if fill:
+            self._features[self.count:self.count + fill] = features[:fill]
+            self._labels[self.count:self.count + fill] = labels[:fill]
+            self.count += fill
+
+        remaining = len(features) - fill
+        if remaining:
+            seen = self.total_seen + fill + np.arange(remaining)
+            slots = (self.rng.random(remaining) * (seen + 1)).astype(np.int64)
+            keep = slots < self.capacity
+            self._features[slots[keep]] = features[fill:][keep]
+            self._labels[slots[keep]] = labels[fill:][keep]
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get a contiguous, zero-copy view of the retained rows; only stable while nothing appends"""
+        if self.retention == 'reservoir':
+            return self._features[:self.count], self._labels[:self.count]
+
+        start = (self._next - self.count) % self.capacity
+        return (self._features[start:start + self.count],
+                self._labels[start:start + self.count])
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copy of the retained rows, consistent even while another thread appends"""
+        with self._lock:
+            features, labels = self.view()
+            return features.copy(), labels.copy()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getstate__(self):
+        with self._lock:
+            state = dict(self.__dict__, _features=self._features.copy(), _labels=self._labels.copy())
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
 class FederatedLearningNode:
     """Individual FL node implementation"""
     
-    def __init__(self, node_id: str, model_type: str = 'neural_network', privacy_budget: float = 1.0):
+    def __init__(self, node_id: str, model_type: str = 'neural_network', privacy_budget: float = 1.0,
+                 keep_gradients: bool = False, history_size: int = 50):
         self.node_id = node_id
         self.model_type = model_type
         self.privacy_budget = privacy_budget
-        self.training_data = None
+        self._training_data = None
+        self._data_loader = None  # Deferred source of training_data, see from_spec(lazy=True)
+        self._data_lock = threading.Lock()
         self.local_model = None
         self.dp = DifferentialPrivacy(epsilon=privacy_budget)
-        self.training_history = []
+        self.keep_gradients = keep_gradients  # Retaining every round's gradients is opt-in
+        self.training_history = TrainingHistory(recent_rounds=history_size)
+        self.data_window = None
+        # The window replaces static training data only once it holds this many rows, so a few streamed
+        # rows cannot shrink a node's training set (and its aggregation weight) to almost nothing
+        self.min_window_rows = 1000
+        self.compressor = None  # Optional UpdateCompressor applied before updates leave the node
+        self.global_model = None
+        self.model_version = 0
+        # Local trainer settings for model_type='logistic_regression'
+        self.local_epochs = 1
+        self.learning_rate = 0.05
+        self.batch_size = 64
+        self.clip_norm = 1.0  # L2 bound on a round's weight change before privacy noise
         
     def add_training_data(self, data: pd.DataFrame):
         """Add training data to the node"""
-        self.training_data = data
-    
-    def train_local_model(self) -> Dict[str, Any]:
-        """Train local model and return updates"""
+        self._training_data = data
+        self._data_loader = None
+
+    def set_data_loader(self, loader: Callable[[], pd.DataFrame]):
+        """Defer training data to loader, called once on first access"""
+        self._training_data = None
+        self._data_loader = loader
+
+    @property
+    def training_data(self) -> Optional[pd.DataFrame]:
+        if self._data_loader is not None:
+            with self._data_lock:
+                if self._data_loader is not None:
+                    self._training_data = self._data_loader()
+                    self._data_loader = None
+        return self._training_data
+
+    @training_data.setter
+    def training_data(self, data: Optional[pd.DataFrame]):
+        self.add_training_data(data)
+
+    def __getstate__(self):
+        # Process executors pickle nodes: resolve deferred data first and leave the lock behind
+        state = dict(self.__dict__, _training_data=self.training_data, _data_loader=None)
+        del state['_data_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._data_lock = threading.Lock()
+
+    def heartbeat(self) -> bool:
+        """In-process nodes are alive by construction"""
+        return True
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any], lazy: bool = False) -> 'FederatedLearningNode':
+        """Build a node from a plain node spec, with training data read from spec['data_path'] (CSV) or
+        generated; lazy defers loading to the first access of training_data"""
+        node = cls(spec['node_id'], spec.get('model_type', 'neural_network'), spec.get('privacy_budget', 1.0))
+        if spec.get('data_path'):
+            loader = functools.partial(pd.read_csv, spec['data_path'])
+        else:
+            loader = functools.partial(NetworkDataGenerator.generate_kdd_like_data,
+                                       spec.get('num_samples', 2000), spec.get('attack_ratio', 0.15))
+        if lazy:
+            node.set_data_loader(loader)
+        else:
+            node.add_training_data(loader())
+        for setting in ('local_epochs', 'learning_rate', 'batch_size', 'clip_norm', 'min_window_rows'):
+            if setting in spec:
+                setattr(node, setting, spec[setting])
+        if spec.get('compression'):
+            node.compressor = UpdateCompressor(spec['compression'], spec.get('compression_ratio', 0.01))
+        return node
+
+    def receive_global_model(self, model: Optional[np.ndarray], version: int):
+        """Adopt the server's published global model before local training"""
+        self.global_model = model
+        self.model_version = version
+
+    def enable_streaming(self, capacity: int = 10000, retention: str = 'sliding',
+                         feature_names: Optional[List[str]] = None, seed: Optional[int] = None):
+        """Train on a bounded window of continuously appended rows instead of a static DataFrame"""
+        if feature_names is None:
+            if self.training_data is None:
+                raise ValueError("Feature names are required before any training data is available")
+            feature_names = self._feature_columns(self.training_data)
+
+        self.data_window = TrainingDataWindow(capacity, feature_names, retention=retention, seed=seed)
+
+    def _ensure_window(self, feature_names: List[str]) -> 'TrainingDataWindow':
+        """Create the streaming window on first append, once even with concurrent appenders"""
+        if self.data_window is None:
+            with self._data_lock:
+                if self.data_window is None:
+                    self.enable_streaming(feature_names=list(feature_names))
+        return self.data_window
+
+    def append_training_data(self, batch: pd.DataFrame):
+        """Append a batch of labelled rows to the node's streaming window"""
+        self._ensure_window(self._feature_columns(batch))
+
+        missing = [name for name in self.data_window.feature_names if name not in batch.columns]
+        if missing or 'label' not in batch.columns:
+            raise ValueError(f"Batch is missing columns: {missing or ['label']}")
+
+        self.data_window.append(
+            batch[self.data_window.feature_names].to_numpy(dtype=self.data_window.dtype),
+            batch['label'].to_numpy()
+        )
+
+    def append_training_arrays(self, features: np.ndarray, labels: np.ndarray, feature_names: List[str]):
+        """Append labelled rows whose columns follow feature_names to the streaming window"""
+        window = self._ensure_window(feature_names)
+        if window.feature_names != list(feature_names):
+            positions = {name: i for i, name in enumerate(feature_names)}
+            missing = [name for name in window.feature_names if name not in positions]
+            if missing:
+                raise ValueError(f"Batch is missing columns: {missing}")
+            features = features[:, [positions[name] for name in window.feature_names]]
+        window.append(features, labels)
+
+    def parameter_count(self) -> int:
+        """Length of this node's update vector, from its model type and feature count, without training"""
+        window = self.data_window
+        num_features = len(window.feature_names) if window is not None else \
+            len(self._feature_columns(self.training_data))
+        if self.model_type == 'logistic_regression':
+            return num_features + 1  # Weights plus bias
+        if self.model_type == 'neural_network':
+            return 2 * num_features
+        return num_features
+
+    @staticmethod
+    def _feature_columns(data: pd.DataFrame) -> List[str]:
+        """Numeric feature columns used for training"""
+        return list(data.drop('label', axis=1).select_dtypes(include=[np.number]).columns)
+
+    def _active_window(self) -> Optional['TrainingDataWindow']:
+        """The streaming window if training should use it: once it holds min_window_rows rows, or whenever
+        it holds rows and there is no static training data"""
+        window = self.data_window
+        if window is None or not len(window):
+            return None
+        if len(window) >= self.min_window_rows or self.training_data is None:
+            return window
+        return None
+
+    @property
+    def data_size(self) -> int:
+        """Number of rows the node would currently train on"""
+        window = self._active_window()
+        if window is not None:
+            return len(window)
+        return 0 if self.training_data is None else len(self.training_data)
+
+    def _training_arrays(self) -> Tuple[Any, Any]:
+        """Get training features and labels, preferring a sufficiently full streaming window"""
+        window = self._active_window()
+        if window is not None:
+            return window.snapshot()  # Copied under the window's lock; ingest may append meanwhile
+
         if self.training_data is None:
             raise ValueError("No training data available")
-        
-        # Simulate model training
+
         X = self.training_data.drop('label', axis=1).select_dtypes(include=[np.number])
         y = self.training_data['label']
+        return X, y
+    
+    def train_local_model(self) -> Dict[str, Any]:
+        """Train local model and return updates"""
+        return self.finalize_update(self.compute_local_update())
+
+    def compute_local_update(self) -> Dict[str, Any]:
+        """Run local training only; safe to execute in a worker thread or process"""
+        X, y = self._training_arrays()
+        if self.model_type == 'logistic_regression':
+            return self._train_logistic_regression(X, y)
         
+        # Simulate model training
         # Simple simulation of different model types
         if self.model_type == 'neural_network':
             # Simulate neural network gradients
@@ -396,28 +1760,493 @@ class FederatedLearningNode:
             'gradients': private_gradients,
             'accuracy': local_accuracy,
             'loss': training_loss,
-            'data_size': len(self.training_data),
+            'data_size': len(y),
             'timestamp': datetime.now().isoformat()
         }
         
-        self.training_history.append(update.copy())
         return update
 
-class FederatedLearningServer:
-    """Federated learning server implementation"""
-    
-    def __init__(self, aggregation_method: str = 'fedavg'):
-        self.aggregation_method = aggregation_method
-        self.nodes = {}
-        self.global_model = None
-        self.training_rounds = 0
-        self.secure_agg = None
-        self.byzantine_tolerance = ByzantineFaultTolerance()
-        self.training_history = []
-        
-    def register_node(self, node: FederatedLearningNode):
-        """Register a new FL node"""
+    @staticmethod
+    def logistic_features(X: Any) -> np.ndarray:
+        """Signed log1p of the numeric features plus a bias column; stateless, so every node and the
+        evaluator map features identically without sharing normalization statistics"""
+        features = np.asarray(X, dtype=np.float64)
+        design = np.empty((features.shape[0], features.shape[1] + 1))
+        np.log1p(np.abs(features), out=design[:, :-1])
+        design[:, :-1] *= np.sign(features)
+        design[:, -1] = 1.0
+        return design
+
+    @staticmethod
+    def _logistic_metrics(weights: np.ndarray, design: np.ndarray, labels: np.ndarray) -> Tuple[float, float]:
+        logits = design @ weights
+        loss = float(np.mean(np.logaddexp(0.0, logits) - labels * logits))
+        accuracy = float(np.mean((logits > 0) == (labels > 0.5)))
+        return accuracy, loss
+
+    @classmethod
+    def evaluate_logistic(cls, weights: np.ndarray, data: pd.DataFrame) -> Tuple[float, float]:
+        """Accuracy and log loss of logistic regression weights on a labelled frame"""
+        X = data.drop('label', axis=1).select_dtypes(include=[np.number])
+        return cls._logistic_metrics(np.asarray(weights, dtype=np.float64).ravel(), cls.logistic_features(X),
+                                     np.asarray(data['label'], dtype=np.float64))
+
+    def _train_logistic_regression(self, X: Any, y: Any) -> Dict[str, Any]:
+        """Mini-batch SGD from the global model; the update carries the trained weights, which is what
+        the server averages"""
+        design = self.logistic_features(X)
+        labels = np.asarray(y, dtype=np.float64)
+        initial = np.zeros(design.shape[1])
+        if self.global_model is not None and np.size(self.global_model) == design.shape[1]:
+            initial = np.asarray(self.global_model, dtype=np.float64).ravel()
+        
+        weights = initial.copy()
+        for _ in range(self.local_epochs):
+            order = np.random.permutation(len(labels))
+            for start in range(0, len(labels), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                rows = design[batch]
+                error = 0.5 * (1.0 + np.tanh(0.5 * (rows @ weights))) - labels[batch]  # sigmoid - y
+                weights -= (self.learning_rate / len(batch)) * (rows.T @ error)
+        
+        # Clip the round's change, then add noise scaled to a single example's share of it
+        delta = weights - initial
+        norm = np.linalg.norm(delta)
+        if norm > self.clip_norm:
+            delta *= self.clip_norm / norm
+        weights = initial + self.dp.add_noise(delta, sensitivity=self.clip_norm / len(labels))
+        accuracy, loss = self._logistic_metrics(weights, design, labels)
+        
+        return {
+            'node_id': self.node_id,
+            'gradients': weights,
+            'accuracy': accuracy,
+            'loss': loss,
+            'data_size': len(labels),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def finalize_update(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        """Compress and record an accepted update in the node's owning process"""
+        if self.compressor is not None:
+            update['compressed'] = self.compressor.compress(update.pop('gradients'))
+        
+        self._record_update(update)
+        return update
+
+    def train_local_model_encoded(self) -> bytes:
+        """Train local model and return the update as a binary wire envelope"""
+        update = self.train_local_model()
+        return UpdateWireFormat.encode(update, round_num=self.training_history.total_recorded)
+
+    def _record_update(self, update: Dict[str, Any]):
+        """Record update metrics, dropping the gradient reference unless explicitly requested"""
+        record = {key: value for key, value in update.items() if key not in ('gradients', 'compressed')}
+        if self.keep_gradients:
+            if 'gradients' in update:
+                record['gradients'] = np.array(update['gradients'], copy=True)
+            else:
+                record['compressed'] = {key: np.array(value, copy=True) if isinstance(value, np.ndarray) else value
+                                        for key, value in update['compressed'].items()}
+
+        self.training_history.append(
+            self.training_history.total_recorded + 1,
+            update['accuracy'],
+            update['loss'],
+            update['data_size'],
+            detail=record
+        )
+
+def _json_default(value: Any) -> Any:
+    """JSON fallback for NumPy scalars and arrays in round records"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+class FLCheckpointer:
+    """Atomic background checkpoints: raw .npy model, JSON metadata and columnar history"""
+    
+    LATEST = 'LATEST'
+    
+    def __init__(self, directory: str, interval_rounds: int = 1, keep: int = 3):
+        self.directory = directory
+        self.interval_rounds = interval_rounds
+        self.keep = keep
+        self.last_write_time = None
+        self.checkpoints_written = 0
+        os.makedirs(directory, exist_ok=True)
+        
+        # Only the newest pending snapshot is kept, so a slow disk never queues up stale work
+        self._pending = None
+        self._condition = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer_loop, name='fl-checkpoint', daemon=True)
+        self._thread.start()
+    
+    def schedule(self, server: 'FederatedLearningServer'):
+        """Snapshot server state in memory and hand it to the writer thread"""
+        model = server.global_model
+        snapshot = {
+            'model': None if model is None else np.array(model, dtype=np.float64, copy=True),
+            'columns': {name: np.array(column, copy=True)
+                        for name, column in server.training_history.columns().items()},
+            'optimizer': None if server.server_optimizer is None or not server.server_optimizer.steps else
+                {name: np.array(value, copy=True) for name, value in server.server_optimizer.state().items()},
+            'metadata': {
+                'format_version': 1,
+                'saved_at': datetime.now().isoformat(),
+                'training_rounds': server.training_rounds,
+                'model_version': server.model_version,
+                'aggregation_method': server.aggregation_method,
+                'server_optimizer': type(server.server_optimizer).__name__ if server.server_optimizer else None,
+                'recent_rounds': server.training_history.tail(server.training_history.recent.maxlen or 10)
+            }
+        }
+        with self._condition:
+            self._pending = snapshot
+            self._condition.notify()
+    
+    def _writer_loop(self):
+        """Write pending snapshots until closed"""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+                self._busy = True
+            try:
+                self._write(snapshot)
+            except Exception as e:
+                logging.error(f"Checkpoint write error: {e}")
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+    
+    def _write(self, snapshot: Dict[str, Any]):
+        """Write a snapshot into a fresh directory, then atomically repoint LATEST at it"""
+        start_time = time.perf_counter()
+        name = f"round_{snapshot['metadata']['training_rounds']:08d}_{snapshot['metadata']['model_version']}"
+        final_dir = os.path.join(self.directory, name)
+        temp_dir = final_dir + '.tmp'
+        os.makedirs(temp_dir, exist_ok=True)
+        
+        if snapshot['model'] is not None:
+            np.save(os.path.join(temp_dir, 'model.npy'), snapshot['model'])
+        np.savez(os.path.join(temp_dir, 'history.npz'), **snapshot['columns'])
+        if snapshot['optimizer'] is not None:
+            np.savez(os.path.join(temp_dir, 'optimizer.npz'), **snapshot['optimizer'])
+        with open(os.path.join(temp_dir, 'metadata.json'), 'w') as f:
+            json.dump(snapshot['metadata'], f, default=_json_default)
+        
+        if os.path.isdir(final_dir):
+            for entry in os.listdir(final_dir):
+                os.remove(os.path.join(final_dir, entry))
+            os.rmdir(final_dir)
+        os.replace(temp_dir, final_dir)
+        
+        pointer = os.path.join(self.directory, self.LATEST)
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(name)
+        os.replace(pointer + '.tmp', pointer)
+        
+        self._prune(name)
+        self.checkpoints_written += 1
+        self.last_write_time = time.perf_counter() - start_time
+    
+    def _prune(self, current: str):
+        """Remove all but the newest keep checkpoints"""
+        checkpoints = sorted(entry for entry in os.listdir(self.directory)
+                             if entry.startswith('round_') and not entry.endswith('.tmp'))
+        for entry in checkpoints[:-self.keep]:
+            if entry == current:
+                continue
+            path = os.path.join(self.directory, entry)
+            try:
+                for item in os.listdir(path):
+                    os.remove(os.path.join(path, item))
+                os.rmdir(path)
+            except OSError as e:
+                # On Windows a restored model still memory-mapped from here blocks deletion; a later
+                # prune retries once the server has replaced that model
+                logging.warning(f"Could not prune checkpoint {entry}: {e}")
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every scheduled snapshot is on disk"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending is None and not self._busy, timeout)
+    
+    def close(self, timeout: float = 10.0):
+        """Flush pending work and stop the writer thread"""
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout=timeout)
+    
+    @classmethod
+    def load(cls, directory: str) -> Optional[Dict[str, Any]]:
+        """Load the latest checkpoint, memory-mapping the model instead of reading it; the mapping is
+        read-only, so anything that must modify the model works on a copy"""
+        pointer = os.path.join(directory, cls.LATEST)
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            path = os.path.join(directory, f.read().strip())
+        
+        with open(os.path.join(path, 'metadata.json')) as f:
+            metadata = json.load(f)
+        model_path = os.path.join(path, 'model.npy')
+        model = np.load(model_path, mmap_mode='r') if os.path.exists(model_path) else None
+        with np.load(os.path.join(path, 'history.npz')) as history:
+            columns = {name: history[name] for name in history.files}
+        optimizer = None
+        optimizer_path = os.path.join(path, 'optimizer.npz')
+        if os.path.exists(optimizer_path):
+            with np.load(optimizer_path) as state:
+                optimizer = {name: state[name] for name in state.files}
+        
+        return {'model': model, 'columns': columns, 'metadata': metadata, 'optimizer': optimizer}
+
+def _compute_node_update(node: 'FederatedLearningNode', seed: int) -> Dict[str, Any]:
+    """Process-pool entry point: reseed so forked workers do not share one random stream"""
+    np.random.seed(seed)
+    return node.compute_local_update()
+
+def _timed_call(function, *args) -> Tuple[Any, float]:
+    """Run function in a pool worker and return its result with the worker-side latency"""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+class LatencySketch:
+    """Log-bucketed latency histogram with bounded relative error; older samples decay away"""
+    
+    def __init__(self, relative_accuracy: float = 0.02, min_latency: float = 1e-4,
+                 max_latency: float = 1e4, decay: float = 0.98):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.min_latency = min_latency
+        self._offset = int(np.floor(np.log(min_latency) / self._log_gamma))
+        self.counts = np.zeros(int(np.ceil(np.log(max_latency) / self._log_gamma)) - self._offset + 1)
+        self.decay = decay
+        self.count = 0
+    
+    def add(self, latency: float, weight: float = 1.0):
+        """Record a latency in seconds, optionally standing for weight identical samples"""
+        bucket = int(np.ceil(np.log(max(latency, self.min_latency)) / self._log_gamma)) - self._offset
+        if self.decay < 1.0:
+            self.counts *= self.decay
+        self.counts[min(bucket, len(self.counts) - 1)] += weight
+        self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated latency at quantile q, or None before the first sample"""
+        if self.count == 0:
+            return None
+        cumulative = np.cumsum(self.counts)
+        bucket = min(int(np.searchsorted(cumulative, q * cumulative[-1])), len(self.counts) - 1)
+        # Bucket k covers (gamma^(k-1), gamma^k]; this estimate is within relative_accuracy of both ends
+        return float(2.0 * self.gamma ** (bucket + self._offset) / (self.gamma + 1.0))
+
+class NodeLatencyTracker:
+    """Per-node training latency (EWMA plus quantile sketch), straggler marking and liveness"""
+    
+    def __init__(self, ewma_alpha: float = 0.2, straggler_factor: float = 2.0, straggler_strikes: int = 3,
+                 min_observations: int = 3):
+        self.ewma_alpha = ewma_alpha
+        self.straggler_factor = straggler_factor  # Slow means an EWMA this many times the fleet median
+        self.straggler_strikes = straggler_strikes  # Consecutive slow rounds before a node is marked
+        self.min_observations = min_observations
+        self._nodes = {}
+        self._lock = threading.Lock()
+    
+    def _entry(self, node_id: str) -> Dict[str, Any]:
+        entry = self._nodes.get(node_id)
+        if entry is None:
+            entry = self._nodes[node_id] = {
+                'ewma': None, 'sketch': LatencySketch(), 'strikes': 0, 'straggler': False,
+                'deadline_misses': 0, 'last_seen': time.monotonic()
+            }
+        return entry
+    
+    def record(self, node_id: str, latency: float):
+        """Record a completed local training run; a finished update also counts as a heartbeat"""
+        with self._lock:
+            entry = self._entry(node_id)
+            entry['ewma'] = latency if entry['ewma'] is None else \
+                entry['ewma'] + self.ewma_alpha * (latency - entry['ewma'])
+            entry['sketch'].add(latency)
+            entry['last_seen'] = time.monotonic()
+            straggler = entry['straggler']
+        NODE_TRAINING_TIME.labels('true' if straggler else 'false').observe(latency)
+    
+    def heartbeat(self, node_id: str):
+        """Mark a node as alive"""
+        with self._lock:
+            self._entry(node_id)['last_seen'] = time.monotonic()
+    
+    def update_stragglers(self, node_ids: List[str], late_nodes: List[str] = ()):
+        """Score one round: late or slow nodes gain a strike, others lose one"""
+        late = set(late_nodes)
+        with self._lock:
+            ewmas = [entry['ewma'] for entry in self._nodes.values() if entry['ewma'] is not None]
+            reference = float(np.median(ewmas)) if ewmas else None
+            for node_id in node_ids:
+                entry = self._entry(node_id)
+                slow = node_id in late or (reference is not None and entry['ewma'] is not None
+                                           and entry['ewma'] > self.straggler_factor * reference)
+                if node_id in late:
+                    entry['deadline_misses'] += 1
+                # Hysteresis: marked after straggler_strikes slow rounds, cleared only once back at zero
+                if slow:
+                    entry['strikes'] = min(entry['strikes'] + 1, self.straggler_strikes)
+                    entry['straggler'] = entry['straggler'] or entry['strikes'] >= self.straggler_strikes
+                else:
+                    entry['strikes'] = max(entry['strikes'] - 1, 0)
+                    entry['straggler'] = entry['straggler'] and entry['strikes'] > 0
+    
+    def is_straggler(self, node_id: str) -> bool:
+        entry = self._nodes.get(node_id)
+        return entry is not None and entry['straggler']
+    
+    def deadline(self, node_ids: List[str], percentile: float, workers: int = 1) -> Optional[float]:
+        """Time for the non-straggler nodes to finish at the given latency percentile, or None while
+        any of them has too little history"""
+        with self._lock:
+            quantiles = []
+            for node_id in node_ids:
+                entry = self._nodes.get(node_id)
+                if entry is not None and entry['straggler']:
+                    continue
+                if entry is None or entry['sketch'].count < self.min_observations:
+                    return None
+                quantiles.append(entry['sketch'].quantile(percentile))
+        if not quantiles:
+            return None
+        # With fewer workers than nodes, runs queue behind each other
+        return max(max(quantiles), sum(quantiles) / max(1, workers))
+    
+    def expired(self, node_ids: List[str], timeout: float) -> List[str]:
+        """Nodes not heard from within timeout seconds"""
+        now = time.monotonic()
+        with self._lock:
+            return [node_id for node_id in node_ids if now - self._entry(node_id)['last_seen'] > timeout]
+    
+    def forget(self, node_id: str):
+        with self._lock:
+            self._nodes.pop(node_id, None)
+    
+    def summary(self, node_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Latency statistics per node for metrics reporting"""
+        with self._lock:
+            entries = {node_id: self._nodes[node_id] for node_id in node_ids if node_id in self._nodes}
+            return {
+                node_id: {
+                    'ewma_latency': entry['ewma'],
+                    'p50_latency': entry['sketch'].quantile(0.5),
+                    'p95_latency': entry['sketch'].quantile(0.95),
+                    'observations': entry['sketch'].count,
+                    'deadline_misses': entry['deadline_misses'],
+                    'straggler': entry['straggler']
+                }
+                for node_id, entry in entries.items()
+            }
+
+def _common_model_type(model_types: Iterable[Optional[str]]) -> Optional[str]:
+    """The one model type all entries share, or None when they differ or are unknown"""
+    model_types = set(model_types)
+    return model_types.pop() if len(model_types) == 1 else None
+
+class FederatedLearningServer:
+    """Federated learning server implementation"""
+    
+    def __init__(self, aggregation_method: str = 'fedavg', history_size: int = 100,
+                 compression: Optional[str] = None, compression_ratio: float = 0.01,
+                 executor: str = 'serial', max_workers: Optional[int] = None,
+                 round_deadline: Optional[float] = None, buffer_size: int = 4,
+                 staleness_exponent: float = 0.5, participation: Optional[float] = None,
+                 sampling: str = 'uniform', sampling_seed: Optional[int] = None,
+                 role: str = 'server', node_id: Optional[str] = None,
+                 deadline_percentile: Optional[float] = None, deadline_slack: float = 1.5,
+                 heartbeat_timeout: Optional[float] = None, straggler_weight: float = 0.1,
+                 server_optimizer: Optional[Any] = None, server_lr: Optional[float] = None):
+        if executor not in ('serial', 'thread', 'process'):
+            raise ValueError(f"Unknown executor type: {executor}")
+        if role not in ('server', 'aggregator'):
+            raise ValueError(f"Unknown server role: {role}")
+        if sampling not in ('uniform', 'weighted'):
+            raise ValueError(f"Unknown sampling strategy: {sampling}")
+        # The parent weights an aggregator's update by its subtree's data_size, which only matches a
+        # data_size-weighted mean; a robust mean or a server optimizer step would be mis-weighted
+        if role == 'aggregator' and (aggregation_method == 'byzantine_tolerant_averaging'
+                                     or server_optimizer is not None):
+            raise ValueError("Aggregator-role servers only support weighted averaging without a server optimizer")
+        if isinstance(server_optimizer, str):
+            if server_optimizer not in SERVER_OPTIMIZERS:
+                raise ValueError(f"Unknown server optimizer: {server_optimizer}")
+            server_optimizer = SERVER_OPTIMIZERS[server_optimizer](
+                **({} if server_lr is None else {'learning_rate': server_lr}))
+
+        # An aggregator is registered with a parent server like a node and forwards one update per round
+        self.role = role
+        self.node_id = node_id or f'aggregator_{id(self):x}'
+        self.aggregation_method = aggregation_method
+        self.server_optimizer = server_optimizer  # None installs the aggregate as the new model unchanged
+        self.compression = compression
+        self.compression_ratio = compression_ratio
+        self.executor_type = executor
+        self.max_workers = max_workers or os.cpu_count()
+        self.round_deadline = round_deadline  # Seconds; late nodes are dropped from the round
+        # Adaptive deadlines: the given latency percentile of non-straggler nodes times deadline_slack,
+        # capped by round_deadline when both are set
+        self.deadline_percentile = deadline_percentile
+        self.deadline_slack = deadline_slack
+        self.heartbeat_timeout = heartbeat_timeout  # Seconds of silence before a node is dropped
+        self.straggler_weight = straggler_weight  # Relative sampling probability of chronic stragglers
+        self.latency = NodeLatencyTracker()
+        self.dropped_nodes = {}
+        self._inflight = set()  # Nodes whose run outlived its round's deadline and is still going
+        self._executor = None
+        self._seed_rng = np.random.default_rng()
+
+        # Per-round client sampling: a fraction (float <= 1) or a fixed count (int) of registered nodes
+        self.participation = participation
+        self.sampling = sampling
+        self.sampling_seed = sampling_seed
+        self.nodes = {}
+        self.global_model = None
+        self.training_rounds = 0
+        self.secure_agg = None
+        self.byzantine_tolerance = ByzantineFaultTolerance()
+        self.training_history = TrainingHistory(recent_rounds=history_size)
+
+        # Asynchronous (FedBuff-style) aggregation state
+        self.buffer_size = buffer_size
+        self.staleness_exponent = staleness_exponent
+        self.model_version = 0
+        self._published_model = (0, None, None)  # (version, model, model type)
+        self._async_buffer = []
+        self._buffer_lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        self._async_stop = threading.Event()
+        self._async_threads = []
+        self.checkpointer = None
+        
+    def register_node(self, node: FederatedLearningNode):
+        """Register a new FL node"""
         self.nodes[node.node_id] = node
+        self.dropped_nodes.pop(node.node_id, None)
+        self.latency.heartbeat(node.node_id)
+
+        # Nodes keep their own compressor so error-feedback residuals stay per node
+        if self.compression and isinstance(node, FederatedLearningNode) and node.compressor is None:
+            node.compressor = UpdateCompressor(self.compression, self.compression_ratio)
         
         # Initialize secure aggregation if needed
         if self.secure_agg is None:
@@ -425,83 +2254,1436 @@ class FederatedLearningServer:
         
     def start_training_round(self) -> bool:
         """Start a new training round"""
+        round_start = time.perf_counter()
         try:
             if len(self.nodes) < 2:
                 logging.warning("Need at least 2 nodes for federated learning")
+                ROUNDS_TOTAL.labels('insufficient_nodes').inc()
                 return False
             
-            # Get updates from all nodes
-            node_updates = {}
-            round_metrics = {}
-            
-            for node_id, node in self.nodes.items():
-                try:
-                    update = node.train_local_model()
-                    node_updates[node_id] = update['gradients']
-                    round_metrics[node_id] = {
-                        'accuracy': update['accuracy'],
-                        'loss': update['loss'],
-                        'data_size': update['data_size']
-                    }
-                except Exception as e:
-                    logging.error(f"Training error for node {node_id}: {e}")
-                    continue
-            
-            if not node_updates:
+            result = self._run_round()
+            if result is None:
+                ROUNDS_TOTAL.labels('no_updates').inc()
                 return False
-            
-            # Aggregate updates
-            if self.aggregation_method == 'byzantine_tolerant_averaging':
-                global_update = self.byzantine_tolerance.robust_aggregation(node_updates)
-            else:
-                # Standard FedAvg
-                global_update = np.mean(list(node_updates.values()), axis=0)
+            global_update, round_metrics, round_info = result
             
             # Update global model
-            self.global_model = global_update
-            self.training_rounds += 1
+            self._apply_global_update(global_update, round_metrics)
             
             # Record training round
-            round_record = {
-                'round': self.training_rounds,
-                'timestamp': datetime.now().isoformat(),
-                'participating_nodes': len(node_updates),
-                'global_accuracy': np.mean([metrics['accuracy'] for metrics in round_metrics.values()]),
-                'average_loss': np.mean([metrics['loss'] for metrics in round_metrics.values()]),
-                'total_data_samples': sum([metrics['data_size'] for metrics in round_metrics.values()]),
-                'node_metrics': round_metrics
-            }
-            
-            self.training_history.append(round_record)
+            self._record_round(round_metrics, round_info)
+            self._maybe_checkpoint()
             
+            ROUNDS_TOTAL.labels('success').inc()
+            ROUND_DURATION.observe(time.perf_counter() - round_start)
             logging.info(f"FL Round {self.training_rounds} completed successfully")
             return True
             
         except Exception as e:
             logging.error(f"Training round error: {e}")
+            ROUNDS_TOTAL.labels('error').inc()
             return False
-    
+
+    def _run_round(self) -> Optional[Tuple[np.ndarray, Dict[str, Dict[str, Any]], Dict[str, Any]]]:
+        """Train sampled nodes and aggregate their updates without installing the result"""
+        # Get updates from this round's sampled nodes
+        round_start = time.perf_counter()
+        self._check_liveness()
+        participants = self._select_participants()
+        sampling_time = time.perf_counter() - round_start
+        deadline = self._round_deadline(participants)
+
+        for node_id in participants:
+            node = self.nodes[node_id]
+            if hasattr(node, 'receive_global_model'):
+                node.receive_global_model(self.global_model, self.model_version)
+        
+        # FedAvg folds each update into a running weighted sum as it arrives;
+        # Byzantine screening needs every update side by side, and so does the first round,
+        # where the model size is chosen by the updates rather than by whichever arrives first
+        streaming = self.aggregation_method != 'byzantine_tolerant_averaging'
+        fold_on_arrival = streaming and self._model_size() is not None
+        accumulator = WeightedUpdateAccumulator(self._model_size()) if streaming else None
+        node_updates = {}
+        round_metrics = {}
+        traffic = {'wire_bytes': 0, 'dense_bytes': 0, 'aggregation_time': 0.0}
+        
+        def collect(node_id: str, update: Any):
+            _, vector, metrics, update_wire_bytes, update_dense_bytes = self._unpack_update(update)
+            if fold_on_arrival:
+                fold_start = time.perf_counter()
+                accumulator.add(vector, metrics['data_size'])
+                traffic['aggregation_time'] += time.perf_counter() - fold_start
+            else:
+                node_updates[node_id] = vector
+            round_metrics[node_id] = metrics
+            traffic['wire_bytes'] += update_wire_bytes
+            traffic['dense_bytes'] += update_dense_bytes
+        
+        late_nodes = self._train_nodes(participants, collect, deadline)
+        LATE_NODES_TOTAL.inc(len(late_nodes))
+        round_metrics = {node_id: round_metrics[node_id] for node_id in participants if node_id in round_metrics}
+        
+        if not round_metrics:
+            return None
+        
+        # Aggregate updates
+        aggregation_start = time.perf_counter()
+        if streaming:
+            # Standard FedAvg, weighted by each node's data_size
+            if not fold_on_arrival:
+                kept = self._filter_model_shape({node_id: node_updates[node_id] for node_id in round_metrics})
+                for node_id, vector in kept.items():
+                    accumulator.add(vector, round_metrics[node_id]['data_size'])
+                round_metrics = {node_id: round_metrics[node_id] for node_id in kept}
+            global_update = accumulator.result()
+        else:
+            # Pairwise screening needs dense vectors, so compressed payloads are expanded here
+            dense_updates = {node_id: UpdateCompressor.decompress(node_updates[node_id])
+                             if isinstance(node_updates[node_id], dict) else node_updates[node_id]
+                             for node_id in round_metrics}
+            dense_updates = self._filter_model_shape(dense_updates)
+            global_update = self.byzantine_tolerance.robust_aggregation(dense_updates)
+            round_metrics = {node_id: round_metrics[node_id] for node_id in dense_updates}
+        aggregation_time = traffic['aggregation_time'] + time.perf_counter() - aggregation_start
+        AGGREGATION_TIME.labels(self.aggregation_method).observe(aggregation_time)
+        
+        wire_bytes = traffic['wire_bytes']
+        round_info = {
+            'bytes_on_wire': wire_bytes,
+            'compression_ratio': traffic['dense_bytes'] / wire_bytes if wire_bytes else 1.0,
+            'round_time': time.perf_counter() - round_start,
+            'deadline': deadline,
+            'late_nodes': late_nodes,
+            'registered_nodes': len(self.nodes),
+            'sampled_nodes': participants,
+            'sampling_time': sampling_time,
+            'aggregation_time': aggregation_time
+        }
+        return global_update, round_metrics, round_info
+
+    @property
+    def model_type(self) -> Optional[str]:
+        """Model type shared by every registered node, or None when they differ"""
+        return _common_model_type(getattr(node, 'model_type', None) for node in self.nodes.values())
+
+    @property
+    def data_size(self) -> int:
+        """Total rows across the subtree; used as this server's weight when it acts as an aggregator"""
+        return sum(getattr(node, 'data_size', 0) for node in self.nodes.values())
+
+    def receive_global_model(self, model: Optional[np.ndarray], version: int):
+        """Aggregator role: adopt the parent's model so it can be passed down to the subtree"""
+        self.global_model = model
+        self.model_version = version
+
+    def heartbeat(self) -> bool:
+        """Aggregator role: an in-process aggregator is alive while it has nodes to aggregate"""
+        return bool(self.nodes)
+
+    def train_local_model(self) -> Dict[str, Any]:
+        """Aggregator role: pre-aggregate the subtree and forward one weighted update upward"""
+        if self.role != 'aggregator':
+            raise RuntimeError("Only aggregator-role servers can act as a node")
+        if not self.nodes:
+            raise ValueError("Aggregator has no registered nodes")
+
+        result = self._run_round()
+        if result is None:
+            raise ValueError("No updates received from the aggregator subtree")
+        global_update, round_metrics, round_info = result
+
+        # The subtree result is a data_size-weighted mean (enforced in __init__), so forwarding it with
+        # its total weight gives the parent the same weighted mean as flat FedAvg over every node
+        sizes = np.array([metrics['data_size'] for metrics in round_metrics.values()], dtype=np.float64)
+        accuracy = np.array([metrics['accuracy'] for metrics in round_metrics.values()])
+        loss = np.array([metrics['loss'] for metrics in round_metrics.values()])
+
+        self.training_rounds += 1
+        self._record_round(round_metrics, round_info)
+
+        return {
+            'node_id': self.node_id,
+            'gradients': global_update,
+            'accuracy': float(np.average(accuracy, weights=sizes)),
+            'loss': float(np.average(loss, weights=sizes)),
+            'data_size': int(sizes.sum()),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def _unpack_update(update: Any) -> Tuple[str, Any, Dict[str, Any], int, int]:
+        """Split a dict or binary update into node id, vector, metrics, wire bytes and dense bytes"""
+        envelope_bytes = None
+        if isinstance(update, (bytes, bytearray, memoryview)):
+            # Binary envelopes are accepted directly and decoded zero-copy
+            envelope_bytes = len(update)
+            update = UpdateWireFormat.decode(update)
+
+        if 'compressed' in update:
+            vector = update['compressed']
+            wire_bytes = envelope_bytes or UpdateCompressor.payload_nbytes(vector)
+            dense_bytes = vector['dense_nbytes']
+        else:
+            vector = update['gradients']
+            wire_bytes = envelope_bytes or vector.nbytes
+            dense_bytes = vector.nbytes
+
+        metrics = {
+            'accuracy': update['accuracy'],
+            'loss': update['loss'],
+            'data_size': update['data_size']
+        }
+        return update['node_id'], vector, metrics, wire_bytes, dense_bytes
+
+    def _apply_global_update(self, global_update: np.ndarray, node_ids: Iterable[str]):
+        """Install a new global model and publish it under a new version, tagged with the model type
+        its contributing nodes share"""
+        if self.server_optimizer is not None:
+            if self.global_model is None or np.size(self.global_model) != np.size(global_update):
+                self.server_optimizer.reset()  # The first model of a given shape is adopted as is
+            else:
+                # Aggregates are fresh arrays, so the step is written straight into them
+                global_update = self.server_optimizer.step(
+                    self.global_model, np.require(global_update, np.float64, ['C', 'W', 'O']))
+        self.global_model = global_update
+        self.training_rounds += 1
+        self.model_version += 1
+        self._published_model = (self.model_version, global_update,
+                                 _common_model_type(getattr(self.nodes.get(node_id), 'model_type', None)
+                                                   for node_id in node_ids))
+
+    def _record_round(self, round_metrics: Dict[str, Dict[str, Any]], extra: Dict[str, Any]):
+        """Append a round record to the bounded training history"""
+        round_record = {
+            'round': self.training_rounds,
+            'timestamp': datetime.now().isoformat(),
+            'participating_nodes': len(round_metrics),
+            'global_accuracy': np.mean([metrics['accuracy'] for metrics in round_metrics.values()]),
+            'average_loss': np.mean([metrics['loss'] for metrics in round_metrics.values()]),
+            'total_data_samples': sum([metrics['data_size'] for metrics in round_metrics.values()])
+        }
+        round_record.update(extra)
+        round_record['node_metrics'] = round_metrics
+
+        self.training_history.append(
+            self.training_rounds,
+            round_record['global_accuracy'],
+            round_record['average_loss'],
+            round_record['total_data_samples'],
+            detail=round_record
+        )
+
+    def enable_checkpointing(self, directory: str, interval_rounds: int = 1, keep: int = 3):
+        """Write a checkpoint from a background thread every interval_rounds rounds"""
+        if self.checkpointer is not None:
+            self.checkpointer.close()
+        self.checkpointer = FLCheckpointer(directory, interval_rounds=interval_rounds, keep=keep)
+
+    def _maybe_checkpoint(self):
+        """Hand a snapshot to the checkpoint writer when one is due"""
+        if self.checkpointer is not None and self.training_rounds % self.checkpointer.interval_rounds == 0:
+            self.checkpointer.schedule(self)
+
+    def restore_checkpoint(self, directory: str) -> bool:
+        """Resume model, round counters and history from the latest checkpoint in directory"""
+        try:
+            checkpoint = FLCheckpointer.load(directory)
+        except Exception as e:
+            logging.error(f"Failed to load checkpoint from {directory}: {e}")
+            return False
+        if checkpoint is None:
+            return False
+
+        metadata = checkpoint['metadata']
+        # A read-only memory map: it is only ever read (optimizer steps and aggregation write into fresh
+        # arrays), and the next round replaces it, releasing the mapping
+        self.global_model = checkpoint['model']
+        self.training_rounds = metadata['training_rounds']
+        self.model_version = metadata['model_version']
+        self._published_model = (self.model_version, self.global_model, self.model_type)
+        self.training_history.restore(checkpoint['columns'], metadata['recent_rounds'])
+        if self.server_optimizer is not None:
+            self.server_optimizer.reset()
+            if checkpoint['optimizer'] is not None and \
+                    metadata.get('server_optimizer') == type(self.server_optimizer).__name__:
+                self.server_optimizer.load_state(checkpoint['optimizer'])
+
+        logging.info(f"Resumed FL server from checkpoint at round {self.training_rounds}")
+        return True
+
+    def pull_model(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Get the current (version, model) pair without taking any lock"""
+        version, model, _ = self._published_model
+        return version, model
+
+    def pull_tagged_model(self) -> Tuple[int, Optional[np.ndarray], Optional[str]]:
+        """Get the current (version, model, model type) without taking any lock; the type is None when
+        the contributing nodes trained different model types"""
+        return self._published_model
+
+    def submit_update(self, update: Any, base_version: int) -> bool:
+        """Buffer an asynchronous update trained against base_version; returns True if it triggered a flush"""
+        node_id, vector, metrics, wire_bytes, _ = self._unpack_update(update)
+        staleness = max(0, self.model_version - base_version)
+        weight = metrics['data_size'] / (1.0 + staleness) ** self.staleness_exponent
+
+        with self._buffer_lock:
+            self._async_buffer.append((node_id, vector, weight, staleness, metrics, wire_bytes))
+            if len(self._async_buffer) < self.buffer_size:
+                return False
+            batch, self._async_buffer = self._async_buffer, []
+
+        # The weighted sum runs outside every lock; only installing the result is serialized
+        self._flush_async_buffer(batch)
+        return True
+
+    def _flush_async_buffer(self, batch: List[Tuple]):
+        """Apply a staleness-weighted aggregate of buffered updates as a new model version"""
+        flush_start = time.perf_counter()
+        accumulator = WeightedUpdateAccumulator(self._expected_model_size(entry[1] for entry in batch))
+        contributors = []  # Batch entries that made it into the aggregate; only these are recorded
+        for entry in batch:
+            node_id, vector, weight = entry[:3]
+            try:
+                accumulator.add(vector, weight)
+                contributors.append(entry)
+            except ValueError as e:
+                logging.error(f"Dropped async update from node {node_id}: {e}")
+        if not accumulator.count:
+            return
+
+        self.latency.update_stragglers([entry[0] for entry in batch])
+        with self._apply_lock:
+            self._apply_global_update(accumulator.result(), [entry[0] for entry in contributors])
+            self._record_round({entry[0]: entry[4] for entry in contributors}, {
+                'mode': 'async',
+                'buffered_updates': len(batch),
+                'rejected_updates': len(batch) - len(contributors),
+                'max_staleness': max(entry[3] for entry in contributors),
+                'mean_staleness': float(np.mean([entry[3] for entry in contributors])),
+                'bytes_on_wire': sum(entry[5] for entry in contributors),
+                'round_time': time.perf_counter() - flush_start
+            })
+            self._maybe_checkpoint()
+
+    def start_async_training(self, node_ids: Optional[List[str]] = None):
+        """Run nodes continuously, each pulling the latest model and submitting when it finishes"""
+        if self._async_threads:
+            return
+
+        self._async_stop.clear()
+        for node_id in node_ids or list(self.nodes):
+            thread = threading.Thread(target=self._async_node_loop, args=(node_id,),
+                                      name=f'fl-async-{node_id}', daemon=True)
+            self._async_threads.append(thread)
+            thread.start()
+
+    def stop_async_training(self, timeout: float = 5.0):
+        """Stop asynchronous node loops"""
+        self._async_stop.set()
+        for thread in self._async_threads:
+            thread.join(timeout=timeout)
+        self._async_threads = []
+
+    def _async_node_loop(self, node_id: str):
+        """Train one node repeatedly against the freshest published model"""
+        while not self._async_stop.is_set():
+            node = self.nodes.get(node_id)
+            if node is None:
+                return
+
+            version, model = self.pull_model()
+            if hasattr(node, 'receive_global_model'):
+                node.receive_global_model(model, version)
+
+            try:
+                train_start = time.perf_counter()
+                update = node.train_local_model()
+                self.latency.record(node_id, time.perf_counter() - train_start)
+                self.submit_update(update, version)
+            except Exception as e:
+                logging.error(f"Async training error for node {node_id}: {e}")
+                self._async_stop.wait(1.0)
+
+    def _select_participants(self) -> List[str]:
+        """Sample this round's participants, reproducibly per round when a seed is configured"""
+        # A node still finishing a late run from an earlier round is busy, not a candidate
+        node_ids = [node_id for node_id in self.nodes if node_id not in self._inflight]
+        if self.participation is None:
+            return node_ids
+
+        if isinstance(self.participation, float) and self.participation <= 1.0:
+            count = int(round(self.participation * len(node_ids)))
+        else:
+            count = int(self.participation)
+        count = min(len(node_ids), max(count, 2))
+        if count == len(node_ids):
+            return node_ids
+
+        if self.sampling_seed is None:
+            rng = self._seed_rng
+        else:
+            rng = np.random.default_rng([self.sampling_seed, self.training_rounds])
+
+        weights = None
+        if self.sampling == 'weighted':
+            sizes = np.fromiter((getattr(self.nodes[node_id], 'data_size', 1) for node_id in node_ids),
+                                dtype=np.float64, count=len(node_ids))
+            if np.count_nonzero(sizes) >= count:
+                weights = sizes
+        stragglers = np.fromiter((self.latency.is_straggler(node_id) for node_id in node_ids),
+                                 dtype=bool, count=len(node_ids))
+        if stragglers.any():
+            weights = (np.ones(len(node_ids)) if weights is None else weights.copy())
+            weights[stragglers] *= self.straggler_weight
+        probabilities = None
+        if weights is not None and np.count_nonzero(weights) >= count:
+            probabilities = weights / weights.sum()
+
+        chosen = rng.choice(len(node_ids), size=count, replace=False, p=probabilities)
+        chosen.sort()  # Keep registration order so results stay deterministic
+        return [node_ids[i] for i in chosen]
+
+    def _get_executor(self):
+        """Lazily create the configured worker pool"""
+        if self._executor is None:
+            if self.executor_type == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='fl-node')
+            elif self.executor_type == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _submit_node(self, executor, node):
+        """Submit one node's local training to the pool"""
+        if not hasattr(node, 'compute_local_update'):
+            return executor.submit(_timed_call, node.train_local_model)
+        if self.executor_type == 'process':
+            seed = int(self._seed_rng.integers(2 ** 32))
+            return executor.submit(_timed_call, _compute_node_update, node, seed)
+        return executor.submit(_timed_call, node.compute_local_update)
+
+    @staticmethod
+    def _finalize_node_update(node, update):
+        """Apply the node's compression and history bookkeeping to an accepted update"""
+        if hasattr(node, 'compute_local_update') and hasattr(node, 'finalize_update'):
+            return node.finalize_update(update)
+        return update
+
+    def _round_deadline(self, node_ids: List[str]) -> Optional[float]:
+        """Seconds allowed for this round: adaptive from latency history when configured, else static"""
+        if self.deadline_percentile is None:
+            return self.round_deadline
+        workers = 1 if self.executor_type == 'serial' else \
+            min(max(1, self.max_workers - len(self._inflight)), len(node_ids))
+        adaptive = self.latency.deadline(node_ids, self.deadline_percentile, workers)
+        if adaptive is None:
+            return self.round_deadline  # Not enough history yet
+        adaptive *= self.deadline_slack
+        return adaptive if self.round_deadline is None else min(adaptive, self.round_deadline)
+
+    def record_heartbeat(self, node_id: str):
+        """Heartbeat pushed by a remote node"""
+        if node_id in self.nodes:
+            self.latency.heartbeat(node_id)
+
+    def _check_liveness(self):
+        """Poll nodes that expose heartbeat() and drop those silent for longer than heartbeat_timeout"""
+        if self.heartbeat_timeout is None:
+            return
+
+        for node_id, node in list(self.nodes.items()):
+            heartbeat = getattr(node, 'heartbeat', None)
+            try:
+                if heartbeat is not None and heartbeat():
+                    self.latency.heartbeat(node_id)
+            except Exception as e:
+                logging.error(f"Heartbeat error for node {node_id}: {e}")
+
+        for node_id in self.latency.expired(list(self.nodes), self.heartbeat_timeout):
+            self.nodes.pop(node_id, None)
+            self.latency.forget(node_id)
+            self.dropped_nodes[node_id] = datetime.now().isoformat()
+            logging.warning(f"Dropped unresponsive node {node_id}")
+
+    def _record_late_latency(self, node_id: str, future):
+        """Record the latency of a run that missed the deadline once it eventually finishes"""
+        self._inflight.discard(node_id)
+        if not future.cancelled() and future.exception() is None:
+            self.latency.record(node_id, future.result()[1])
+
+    def _train_nodes(self, node_ids: List[str], on_update, deadline: Optional[float] = None) -> List[str]:
+        """Train the given nodes, handing each update to on_update as it completes; returns late node ids"""
+        late_nodes = []
+        trained = []
+        deadline_at = None if deadline is None else time.monotonic() + deadline
+        # Chronic stragglers are scheduled last, so they are the ones a deadline cuts off
+        node_ids = sorted(node_ids, key=self.latency.is_straggler)
+
+        def deliver(node_id: str, update: Any):
+            try:
+                on_update(node_id, update)
+            except Exception as e:
+                logging.error(f"Invalid update from node {node_id}: {e}")
+
+        if self.executor_type == 'serial':
+            for node_id in node_ids:
+                if deadline_at is not None and time.monotonic() >= deadline_at:
+                    late_nodes.append(node_id)
+                    continue
+                try:
+                    train_start = time.perf_counter()
+                    update = self.nodes[node_id].train_local_model()
+                    self.latency.record(node_id, time.perf_counter() - train_start)
+                except Exception as e:
+                    logging.error(f"Training error for node {node_id}: {e}")
+                    continue
+                trained.append(node_id)
+                deliver(node_id, update)
+        else:
+            executor = self._get_executor()
+            futures = {self._submit_node(executor, self.nodes[node_id]): node_id for node_id in node_ids}
+            timeout = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+
+            # Updates are folded in completion order so aggregation overlaps with the remaining training
+            pending = set(futures)
+            try:
+                for future in as_completed(futures, timeout=timeout):
+                    pending.discard(future)
+                    node_id = futures[future]
+                    try:
+                        update, latency = future.result()
+                        self.latency.record(node_id, latency)
+                        update = self._finalize_node_update(self.nodes[node_id], update)
+                    except Exception as e:
+                        logging.error(f"Training error for node {node_id}: {e}")
+                        continue
+                    trained.append(node_id)
+                    deliver(node_id, update)
+            except FuturesTimeoutError:
+                for future in pending:
+                    # Queued work is dropped; running work finishes but only its latency is kept
+                    if not future.cancel():
+                        self._inflight.add(futures[future])
+                        future.add_done_callback(functools.partial(self._record_late_latency, futures[future]))
+                late_ids = {futures[future] for future in pending}
+                late_nodes = [node_id for node_id in node_ids if node_id in late_ids]
+
+        self.latency.update_stragglers(trained + late_nodes, late_nodes)
+        if late_nodes:
+            logging.warning(f"Round deadline missed by nodes: {late_nodes}")
+        return late_nodes
+
+    def _model_size(self) -> Optional[int]:
+        """Size of the current global model, or None before the first round"""
+        return None if self.global_model is None else int(np.size(self.global_model))
+
+    @staticmethod
+    def _update_size(update: Any) -> int:
+        """Parameter count of a dense or compressed update"""
+        return update['size'] if isinstance(update, dict) else int(np.size(update))
+
+    def _expected_model_size(self, updates: Iterable[Any]) -> int:
+        """Global model size, or the most common update size before the first round (ties go to the
+        first update seen, so the choice does not depend on completion order once updates are ordered)"""
+        if self._model_size() is not None:
+            return self._model_size()
+        sizes = [self._update_size(update) for update in updates]
+        return max(dict.fromkeys(sizes), key=sizes.count)
+
+    def reconcile_model_shape(self) -> Optional[int]:
+        """Check before training that every registered node produces the same model size, so that none is
+        silently dropped from every round; a restored global model of another size is discarded"""
+        sizes = {node_id: node.parameter_count() for node_id, node in self.nodes.items()
+                 if hasattr(node, 'parameter_count')}
+        if len(set(sizes.values())) > 1:
+            by_size = {}
+            for node_id, size in sizes.items():
+                by_size.setdefault(size, []).append(node_id)
+            raise ValueError(f"Registered nodes produce incompatible model sizes: {by_size}")
+        size = next(iter(sizes.values()), None)
+        if size is not None and self.global_model is not None and np.size(self.global_model) != size:
+            logging.warning(f"Discarding the restored global model: its size {np.size(self.global_model)} "
+                            f"does not match the nodes' model size {size}")
+            self.global_model = None
+            self._published_model = (self.model_version, None, None)
+            if self.server_optimizer is not None:
+                self.server_optimizer.reset()
+        return size
+
+    def _filter_model_shape(self, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep updates matching the global model size (or the most common size before the first round)"""
+        expected = self._expected_model_size(updates.values())
+        kept = {node_id: update for node_id, update in updates.items() if self._update_size(update) == expected}
+        if len(kept) < len(updates):
+            dropped = [node_id for node_id in updates if node_id not in kept]
+            logging.warning(f"Dropped updates with a model size other than {expected}: {dropped}")
+        return kept
+
+    def shutdown(self):
+        """Release the node training pool and flush any pending checkpoint"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.checkpointer is not None:
+            self.checkpointer.close()
+            self.checkpointer = None
+
     def get_global_model(self) -> Optional[np.ndarray]:
         """Get the current global model"""
         return self.global_model
     
     def get_training_metrics(self) -> Dict[str, Any]:
         """Get comprehensive training metrics"""
-        if not self.training_history:
+        latest = self.training_history.latest()
+        if latest is None:
             return {}
         
-        latest = self.training_history[-1]
-        
         return {
             'total_rounds': self.training_rounds,
             'active_nodes': len(self.nodes),
             'latest_accuracy': latest['global_accuracy'],
             'latest_loss': latest['average_loss'],
             'total_samples': latest['total_data_samples'],
-            'training_history': self.training_history[-10:],  # Last 10 rounds
-            'node_status': {node_id: 'active' for node_id in self.nodes.keys()}
+            'bytes_on_wire': latest['bytes_on_wire'],
+            'compression_ratio': latest.get('compression_ratio', 1.0),
+            'model_version': self.model_version,
+            'training_history': self.training_history.tail(10),  # Last 10 rounds
+            'node_status': self.get_node_status(),
+            'node_latency': self.latency.summary(list(self.nodes))
         }
 
+    def get_node_status(self) -> Dict[str, str]:
+        """Status per node: active, straggler, or dropped after missing heartbeats"""
+        status = {node_id: 'straggler' if self.latency.is_straggler(node_id) else 'active'
+                  for node_id in self.nodes}
+        status.update({node_id: 'dropped' for node_id in self.dropped_nodes if node_id not in status})
+        return status
+
+def _aggregator_process_main(conn, aggregator_id: str, node_specs: List[Dict[str, Any]],
+                             server_options: Dict[str, Any]):
+    """Worker loop for an AggregatorProcess: owns its subtree and answers round commands"""
+    np.random.seed()  # Fresh entropy rather than the parent's inherited random state
+    aggregator = FederatedLearningServer(role='aggregator', node_id=aggregator_id, **server_options)
+    for spec in node_specs:
+        aggregator.register_node(FederatedLearningNode.from_spec(spec))
+    conn.send(('ready', aggregator.data_size))
+
+    while True:
+        command = conn.recv()
+        if command[0] == 'stop':
+            break
+
+        _, version, model_size = command
+        model = np.frombuffer(conn.recv_bytes(), dtype=np.float64) if model_size else None
+        aggregator.receive_global_model(model, version)
+        try:
+            update = aggregator.train_local_model()
+        except Exception as e:
+            conn.send(('error', str(e)))
+            continue
+        conn.send(('update',))
+        conn.send_bytes(UpdateWireFormat.encode(update, round_num=version))
+
+    aggregator.shutdown()
+    conn.close()
+
+class AggregatorProcess:
+    """Edge aggregator whose subtree lives in a separate local process"""
+    
+    def __init__(self, aggregator_id: str, node_specs: List[Dict[str, Any]],
+                 server_options: Optional[Dict[str, Any]] = None, start_method: Optional[str] = None):
+        context = multiprocessing.get_context(start_method)
+        self.node_id = aggregator_id
+        self.model_type = _common_model_type(spec.get('model_type', 'neural_network') for spec in node_specs)
+        self.global_model = None
+        self.model_version = 0
+        self._lock = threading.Lock()
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_aggregator_process_main,
+            args=(child_conn, aggregator_id, node_specs, server_options or {}),
+            name=f'fl-aggregator-{aggregator_id}',
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        _, self.data_size = self._conn.recv()
+    
+    def receive_global_model(self, model: Optional[np.ndarray], version: int):
+        """Remember the model to ship with the next round command"""
+        self.global_model = model
+        self.model_version = version
+    
+    def heartbeat(self) -> bool:
+        """Check that the aggregator process is still running"""
+        return self._process.is_alive()
+    
+    def train_local_model(self) -> bytes:
+        """Run one subtree round in the worker and return its update as a wire envelope"""
+        with self._lock:
+            model = self.global_model
+            self._conn.send(('train', self.model_version, 0 if model is None else np.size(model)))
+            if model is not None:
+                self._conn.send_bytes(np.ascontiguousarray(model, dtype=np.float64))
+            
+            status = self._conn.recv()
+            if status[0] == 'error':
+                raise RuntimeError(f"Aggregator {self.node_id} failed: {status[1]}")
+            return self._conn.recv_bytes()
+    
+    def close(self, timeout: float = 5.0):
+        """Stop the worker process"""
+        with self._lock:
+            if self._process.is_alive():
+                self._conn.send(('stop',))
+                self._process.join(timeout=timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._conn.close()
+
+def _node_worker_main(conn, node_specs: List[Dict[str, Any]]):
+    """Worker loop for a group of nodes; updates are written into a shared memory slot per node"""
+    np.random.seed()  # Fresh entropy rather than the parent's inherited random state
+    nodes = [FederatedLearningNode.from_spec(spec) for spec in node_specs]
+
+    # Size every slot for the largest envelope the group can produce (a dense float64 update)
+    slot_bytes = max(UpdateWireFormat.dense_size(node.node_id, node.parameter_count()) for node in nodes)
+    slot_bytes += -slot_bytes % 64
+    conn.send(('ready', [node.data_size for node in nodes], slot_bytes))
+
+    _, shm_name = conn.recv()
+    segment = shared_memory.SharedMemory(name=shm_name)
+    buffer = segment.buf
+
+    while True:
+        command = conn.recv()
+        kind = command[0]
+        if kind == 'stop':
+            break
+        if kind == 'ping':
+            conn.send(('pong', time.time()))
+            continue
+        if kind == 'model':
+            _, version, model_size = command
+            model = np.frombuffer(conn.recv_bytes(), dtype=np.float64) if model_size else None
+            for node in nodes:
+                node.receive_global_model(model, version)
+            continue
+
+        _, index = command
+        try:
+            update = nodes[index].train_local_model()
+            parts = UpdateWireFormat.encode_parts(update, round_num=nodes[index].model_version)
+            length = sum(len(part) for part in parts)
+            if length > slot_bytes:
+                raise ValueError(f"Update of {length} bytes exceeds the {slot_bytes}-byte slot")
+
+            offset = index * slot_bytes
+            for part in parts:
+                buffer[offset:offset + len(part)] = part
+                offset += len(part)
+            conn.send(('done', length))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+    del buffer
+    segment.close()
+    conn.close()
+
+class WorkerNodeProxy:
+    """Server-side stand-in for a node that lives in a MultiProcessNodeRuntime worker"""
+    
+    def __init__(self, worker: '_NodeWorker', index: int, node_id: str, data_size: int,
+                 model_type: str = 'neural_network'):
+        self.worker = worker
+        self.index = index
+        self.node_id = node_id
+        self.data_size = data_size
+        self.model_type = model_type
+        self.global_model = None
+        self.model_version = 0
+    
+    def receive_global_model(self, model: Optional[np.ndarray], version: int):
+        """Remember the model; the worker is sent each version at most once"""
+        self.global_model = model
+        self.model_version = version
+    
+    def train_local_model(self) -> bytes:
+        """Train in the worker and return the envelope, copied out of its shared memory slot"""
+        return self.worker.train(self.index, self.global_model, self.model_version)
+    
+    def heartbeat(self) -> bool:
+        """Check that the worker process is alive and responsive"""
+        return self.worker.ping()
+
+class _NodeWorker:
+    """One worker process, its control pipe and its shared memory update slots"""
+    
+    def __init__(self, context, node_specs: List[Dict[str, Any]], name: str):
+        self._lock = threading.Lock()
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_node_worker_main, args=(child_conn, node_specs),
+                                       name=name, daemon=True)
+        self.process.start()
+        child_conn.close()
+        
+        _, data_sizes, self.slot_bytes = self._conn.recv()
+        self.segment = shared_memory.SharedMemory(create=True, size=self.slot_bytes * len(node_specs))
+        self._conn.send(('shm', self.segment.name))
+        self._model_version = None
+        self._training = False  # A train holds the control channel; pings then only check the process
+        self.proxies = [WorkerNodeProxy(self, i, spec['node_id'], size, spec.get('model_type', 'neural_network'))
+                        for i, (spec, size) in enumerate(zip(node_specs, data_sizes))]
+    
+    def train(self, index: int, model: Optional[np.ndarray], version: int) -> bytes:
+        """Run one node's local training and copy its envelope out of the shared memory slot.
+        
+        The slot is rewritten by the node's next train, and buffered async updates decode zero-copy,
+        so handing out a view would let a later update overwrite one still waiting to be aggregated.
+        """
+        with self._lock:
+            self._training = True
+            try:
+                if version != self._model_version:
+                    self._conn.send(('model', version, 0 if model is None else np.size(model)))
+                    if model is not None:
+                        self._conn.send_bytes(np.ascontiguousarray(model, dtype=np.float64))
+                    self._model_version = version
+                
+                self._conn.send(('train', index))
+                status = self._conn.recv()
+                if status[0] == 'error':
+                    raise RuntimeError(f"Worker {self.process.name} failed: {status[1]}")
+                
+                offset = index * self.slot_bytes
+                with self.segment.buf[offset:offset + status[1]] as view:
+                    return bytes(view)
+            finally:
+                self._training = False
+    
+    def ping(self, timeout: float = 1.0) -> bool:
+        """Round-trip a ping over the control channel; while a train holds the channel, a running
+        process counts as alive so slow training is not mistaken for a dead worker"""
+        if not self.process.is_alive():
+            return False
+        if not self._lock.acquire(timeout=timeout):
+            return self._training and self.process.is_alive()
+        try:
+            self._conn.send(('ping',))
+            return self._conn.poll(timeout) and self._conn.recv()[0] == 'pong'
+        except (OSError, EOFError):
+            return False
+        finally:
+            self._lock.release()
+    
+    def close(self, timeout: float = 5.0):
+        """Stop the worker and release its shared memory"""
+        with self._lock:
+            try:
+                if self.process.is_alive():
+                    self._conn.send(('stop',))
+                    self.process.join(timeout=timeout)
+            except (OSError, EOFError):
+                pass
+            if self.process.is_alive():
+                self.process.terminate()
+            self._conn.close()
+            try:
+                self.segment.close()
+            except BufferError:
+                logging.warning(f"Shared memory of {self.process.name} still referenced at shutdown")
+            self.segment.unlink()
+
+class MultiProcessNodeRuntime:
+    """Runs FL nodes in worker processes and exchanges their updates through shared memory"""
+    
+    def __init__(self, node_specs: List[Dict[str, Any]], nodes_per_worker: int = 1,
+                 start_method: Optional[str] = None):
+        context = multiprocessing.get_context(start_method)
+        # Workers must share the parent's resource tracker, or each would "clean up" segments it only attached to
+        resource_tracker.ensure_running()
+        self.workers = [
+            _NodeWorker(context, node_specs[i:i + nodes_per_worker], f'fl-node-worker-{i // nodes_per_worker}')
+            for i in range(0, len(node_specs), nodes_per_worker)
+        ]
+        self.nodes = [proxy for worker in self.workers for proxy in worker.proxies]
+    
+    def register_with(self, server: 'FederatedLearningServer'):
+        """Register every worker-hosted node with a server (use a thread executor for parallel rounds)"""
+        for proxy in self.nodes:
+            server.register_node(proxy)
+    
+    def close(self):
+        """Stop all workers"""
+        for worker in self.workers:
+            worker.close()
+
+class ScoringEngine:
+    """Scores flow-feature rows against the published global model in size- and time-bounded micro-batches"""
+    
+    # Local trainers whose parameters are logistic weights; the others publish simulated parameter vectors
+    SCORING_MODEL_TYPES = frozenset({'logistic_regression'})
+    
+    def __init__(self, num_features: int, model_source=None, max_batch: int = 4096, max_wait: float = 0.005,
+                 max_queue_rows: int = 1000000, threshold: float = 0.5, threat_window: float = 60.0,
+                 reputation: Optional['IPReputationIndex'] = None):
+        self.num_features = num_features
+        self.model_source = model_source  # Callable returning (version, weights, model type), e.g. pull_tagged_model
+        self.max_batch = max_batch
+        self.max_wait = max_wait  # Seconds the oldest queued row may wait for a batch to fill
+        self.max_queue_rows = max_queue_rows
+        self.threshold = threshold
+        self.threat_window = threat_window
+        self.reputation = reputation  # Flows touching known-bad addresses skip the model
+        
+        # (version, weights, bias) is swapped as one reference, so a batch always sees a consistent model
+        self._model = None
+        self._queue = deque()  # (rows, enqueue time) chunks
+        self._queued_rows = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._features = np.empty((max_batch, num_features))  # Scoring thread's transform buffer
+        self._source_version = None
+        self._unsupported_version = None
+        
+        self.rows_scored = 0
+        self.rows_dropped = 0
+        self.rows_blocklisted = 0
+        self.threats_detected = 0
+        self.batches = 0
+        self.busy_time = 0.0
+        self.latency = LatencySketch(decay=0.999)
+        self._started_at = None
+        self._recent_threats = deque()  # (time, flagged rows) per batch inside threat_window
+    
+    @classmethod
+    def for_server(cls, server: 'FederatedLearningServer', num_features: int, **kwargs) -> 'ScoringEngine':
+        """Engine that follows the server's published model versions"""
+        return cls(num_features, model_source=server.pull_tagged_model, **kwargs)
+    
+    def publish_model(self, weights: Optional[np.ndarray], version: int, model_type: Optional[str]):
+        """Atomically replace the scoring model; batches already running finish on the old one"""
+        if weights is None:
+            self._model = None
+            return
+        if model_type not in self.SCORING_MODEL_TYPES:
+            if self._unsupported_version != version:
+                logging.warning(f"Model version {version} was trained as {model_type or 'mixed model types'}; "
+                                f"only {sorted(self.SCORING_MODEL_TYPES)} models are scored")
+                self._unsupported_version = version
+            self._model = None
+            return
+        flat = np.ascontiguousarray(weights, dtype=np.float64).ravel()
+        if flat.size == self.num_features + 1:
+            self._model = (version, flat[:-1], float(flat[-1]))
+        elif flat.size == self.num_features:
+            self._model = (version, flat, 0.0)
+        else:
+            if self._unsupported_version != version:
+                logging.warning(f"Model version {version} has {flat.size} parameters; "
+                                f"expected {self.num_features} or {self.num_features + 1}")
+                self._unsupported_version = version
+            self._model = None
+    
+    def _current_model(self):
+        if self.model_source is not None:
+            version, weights, model_type = self.model_source()
+            if version != self._source_version:
+                self.publish_model(weights, version, model_type)
+                self._source_version = version
+        return self._model
+    
+    def _rows(self, rows: Any) -> np.ndarray:
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.drop(columns='label', errors='ignore').select_dtypes(include=[np.number])
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        if rows.shape[1] != self.num_features:
+            raise ValueError(f"Expected {self.num_features} features, got {rows.shape[1]}")
+        return rows
+    
+    def score(self, rows: Any) -> Optional[np.ndarray]:
+        """Score rows synchronously; returns attack probabilities, or None without a usable model"""
+        rows = self._rows(rows)
+        model = self._current_model()
+        if model is None:
+            return None
+        scores = np.empty(len(rows))
+        features = np.empty((min(len(rows), self.max_batch), self.num_features))
+        for start in range(0, len(rows), self.max_batch):
+            chunk = rows[start:start + self.max_batch]
+            scores[start:start + len(chunk)] = self._score_batch(chunk, model, features)
+        return scores
+    
+    @staticmethod
+    def _score_batch(rows: np.ndarray, model, buffer: np.ndarray) -> np.ndarray:
+        """Vectorized logistic score with the same signed log1p transform as the local trainer"""
+        _, weights, bias = model
+        features = buffer[:len(rows)]
+        np.abs(rows, out=features)
+        np.log1p(features, out=features)
+        features *= np.sign(rows)
+        logits = features @ weights
+        logits += bias
+        np.tanh(0.5 * logits, out=logits)  # sigmoid(z) = (1 + tanh(z / 2)) / 2
+        logits += 1.0
+        logits *= 0.5
+        return logits
+    
+    def submit(self, rows: Any, src: Any = None, dst: Any = None) -> bool:
+        """Queue rows (not copied) for scoring without blocking; returns False and drops them when full.
+        
+        With a reputation index and per-row src/dst addresses, confirmed known-bad flows are counted as threats
+        immediately and never reach the model.
+        """
+        rows = self._rows(rows)
+        if self.reputation is not None and src is not None and dst is not None:
+            known_bad = self.reputation.match_flows(src, dst)
+            blocked = int(np.count_nonzero(known_bad))
+            if blocked:
+                rows = rows[~known_bad]
+                with self._condition:
+                    self.rows_blocklisted += blocked
+                    self._record_threats(blocked)
+            if not len(rows):
+                return True
+        
+        with self._condition:
+            if self._queued_rows + len(rows) > self.max_queue_rows:
+                self.rows_dropped += len(rows)
+                return False
+            self._queue.append((rows, time.perf_counter()))
+            self._queued_rows += len(rows)
+            if self._queued_rows >= self.max_batch or len(self._queue) == 1:
+                self._condition.notify()
+        return True
+    
+    def start(self):
+        """Start the scoring thread"""
+        if self._running:
+            return
+        self._running = True
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._scoring_loop, name='fl-scoring', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop scoring; rows still queued are discarded"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+    
+    def _next_batch(self) -> Optional[Tuple[np.ndarray, List[Tuple[int, float]]]]:
+        """Wait for a full batch or for the oldest row to reach max_wait, then take up to max_batch rows"""
+        with self._condition:
+            while self._running:
+                if self._queued_rows >= self.max_batch:
+                    break
+                if self._queue:
+                    remaining = self._queue[0][1] + self.max_wait - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+            if not self._running:
+                return None
+            
+            parts = []
+            arrivals = []  # (rows, enqueue time) per chunk, for latency accounting
+            taken = 0
+            while self._queue and taken < self.max_batch:
+                rows, enqueued = self._queue[0]
+                room = self.max_batch - taken
+                if len(rows) > room:
+                    self._queue[0] = (rows[room:], enqueued)
+                    rows = rows[:room]
+                else:
+                    self._queue.popleft()
+                parts.append(rows)
+                arrivals.append((len(rows), enqueued))
+                taken += len(rows)
+            self._queued_rows -= taken
+        
+        batch = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return batch, arrivals
+    
+    def _scoring_loop(self):
+        """Form micro-batches and score them until stopped"""
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+            batch, arrivals = item
+            
+            try:
+                start = time.perf_counter()
+                model = self._current_model()
+                if model is None:
+                    with self._condition:
+                        self.rows_dropped += len(batch)  # Nothing usable to score against
+                    continue
+                scores = self._score_batch(batch, model, self._features)
+                flagged = int(np.count_nonzero(scores >= self.threshold))
+                done = time.perf_counter()
+                
+                with self._condition:
+                    self.busy_time += done - start
+                    self.rows_scored += len(batch)
+                    self.batches += 1
+                    for count, enqueued in arrivals:
+                        self.latency.add(done - enqueued, weight=count)
+                    self._record_threats(flagged)
+            except Exception as e:
+                logging.error(f"Scoring error: {e}")
+    
+    def _record_threats(self, flagged: int):
+        """Count flagged rows; caller holds the condition lock"""
+        now = time.monotonic()
+        self.threats_detected += flagged
+        self._recent_threats.append((now, flagged))
+        while self._recent_threats[0][0] < now - self.threat_window:
+            self._recent_threats.popleft()
+    
+    def active_threats(self) -> int:
+        """Rows flagged as attacks within the last threat_window seconds"""
+        cutoff = time.monotonic() - self.threat_window
+        with self._condition:
+            return sum(flagged for scored_at, flagged in self._recent_threats if scored_at >= cutoff)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput, queueing latency and detection counters"""
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        model = self._model
+        with self._condition:
+            # Counters move together under the lock, so the ratios below come from one consistent view
+            rows_scored, batches, busy_time = self.rows_scored, self.batches, self.busy_time
+            stats = {
+                'running': self._running,
+                'model_version': model[0] if model is not None else None,
+                'rows_scored': rows_scored,
+                'rows_dropped': self.rows_dropped,
+                'rows_blocklisted': self.rows_blocklisted,
+                'queued_rows': self._queued_rows,
+                'batches': batches,
+                'p50_latency': self.latency.quantile(0.5),
+                'p99_latency': self.latency.quantile(0.99),
+                'threats_detected': self.threats_detected,
+                'active_threats': self.active_threats()
+            }
+        stats.update(avg_batch_size=rows_scored / batches if batches else 0.0,
+                     rows_per_second=rows_scored / elapsed if elapsed else 0.0,
+                     scoring_rows_per_second=rows_scored / busy_time if busy_time else 0.0)
+        return stats
+
+class FlowBatchFormat:
+    """Columnar binary body for flow ingest: fixed header, column names, then one contiguous buffer per column"""
+
+    MAGIC = b'FLRB'
+    VERSION = 1
+    CONTENT_TYPE = 'application/vnd.agisfl.columnar'
+    # magic, version, has labels, dtype, reserved, rows, columns, names length
+    HEADER = struct.Struct('<4sBBBBqII')
+    DTYPES = {'<f8': 1, '<f4': 2}
+
+    @classmethod
+    def encode(cls, features: np.ndarray, feature_names: List[str], labels: Optional[np.ndarray] = None) -> bytes:
+        """Encode a (rows, columns) feature matrix and optional labels"""
+        features = np.asarray(features)
+        if features.dtype.str not in cls.DTYPES:
+            features = features.astype(np.float32)
+        names = '\n'.join(feature_names).encode('utf-8')
+        header = bytearray(cls.HEADER.pack(cls.MAGIC, cls.VERSION, labels is not None, cls.DTYPES[features.dtype.str],
+                                           0, len(features), len(feature_names), len(names)))
+        header += names
+        header += b'\0' * (-len(header) % 8)  # Keep column buffers 8-byte aligned
+
+        parts = [header, np.ascontiguousarray(features.T).tobytes()]
+        if labels is not None:
+            parts.append(np.asarray(labels, dtype=features.dtype).tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def decode(cls, data: Any) -> Tuple[np.ndarray, List[str], Optional[np.ndarray]]:
+        """Decode to a zero-copy (rows, columns) feature view, column names and labels"""
+        view = memoryview(data)
+        if len(view) < cls.HEADER.size:
+            raise ValueError("Truncated columnar batch")
+        magic, version, has_labels, dtype_code, _, rows, columns, names_length = cls.HEADER.unpack_from(view, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a columnar flow batch")
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported columnar batch version: {version}")
+        dtype = {code: np.dtype(name) for name, code in cls.DTYPES.items()}.get(dtype_code)
+        if dtype is None:
+            raise ValueError(f"Unsupported columnar dtype code: {dtype_code}")
+
+        offset = cls.HEADER.size
+        names = bytes(view[offset:offset + names_length]).decode('utf-8').split('\n') if columns else []
+        offset += names_length
+        offset += -offset % 8
+        if len(view) != offset + (rows * columns + (rows if has_labels else 0)) * dtype.itemsize:
+            raise ValueError("Columnar batch length does not match its header")
+
+        features = np.frombuffer(view, dtype=dtype, count=rows * columns, offset=offset).reshape(columns, rows).T
+        labels = np.frombuffer(view, dtype=dtype, count=rows, offset=offset + features.nbytes) if has_labels else None
+        return features, names, labels
+
+class FlowIngestor:
+    """Bounded ingest queue: parses and validates flow batches, then routes them to node training windows
+    and the scoring engine from a background thread"""
+
+    # Optional per-row endpoint columns (dotted quads or integers); with both present, the scoring engine can
+    # short-circuit known-bad flows against its reputation index
+    ADDRESS_COLUMNS = ('src', 'dst')
+
+    def __init__(self, feature_names: List[str], nodes: Any = None, scoring_engine: Optional['ScoringEngine'] = None,
+                 max_queue_rows: int = 200000):
+        self.feature_names = list(feature_names)
+        self.nodes = nodes  # Dict of nodes, or a callable returning one (e.g. lambda: server.nodes)
+        self.scoring_engine = scoring_engine
+        self.max_queue_rows = max_queue_rows
+        self._getter = operator.itemgetter(*self.feature_names)
+
+        self._queue = deque()
+        self._queued_rows = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._next_node = 0
+
+        self.rows_accepted = 0
+        self.rows_rejected = 0
+        self.rows_throttled = 0
+        self.rows_routed = 0
+        self._drain_rate = None  # EWMA of rows/s routed, for Retry-After
+
+    def parse(self, body: bytes, content_type: str = 'application/json'
+              ) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray], int]:
+        """Parse a JSON, NDJSON or columnar body into validated (features, labels, addresses, rejected rows);
+        addresses is a (rows, 2) uint32 src/dst array, or None when the batch carries no address columns"""
+        mime = (content_type or 'application/json').split(';')[0].strip().lower()
+        parse_start = time.perf_counter()
+        if mime in (FlowBatchFormat.CONTENT_TYPE, 'application/octet-stream'):
+            data_format = 'columnar'
+            columns, names, labels = FlowBatchFormat.decode(body)
+            features, addresses = self._select(columns, names)
+        else:
+            try:
+                if mime in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+                    data_format = 'ndjson'
+                    payload = _json_loads(b'[' + b','.join(line for line in bytes(body).splitlines() if line.strip())
+                                          + b']')
+                else:
+                    data_format = 'json'
+                    payload = _json_loads(body)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON body: {e}")
+            features, labels, addresses = self._from_json(payload)
+
+        features, labels, addresses, rejected = self._validate(features, labels, addresses)
+        INGEST_PARSE_TIME.labels(data_format).observe(time.perf_counter() - parse_start)
+        return features, labels, addresses, rejected
+
+    def _select(self, columns: np.ndarray, names: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Reorder decoded columns into feature order and pick out the address columns"""
+        positions = {name: i for i, name in enumerate(names)}
+        missing = [name for name in self.feature_names if name not in positions]
+        if missing:
+            raise ValueError(f"Batch is missing columns: {missing}")
+        addresses = None
+        if all(name in positions for name in self.ADDRESS_COLUMNS):
+            if columns.dtype != np.float64:
+                raise ValueError("Address columns need a float64 columnar batch to hold IPv4 addresses exactly")
+            addresses = self._addresses(*(columns[:, positions[name]] for name in self.ADDRESS_COLUMNS))
+        if names == self.feature_names:
+            return columns, addresses
+        return columns[:, [positions[name] for name in self.feature_names]], addresses
+
+    def _from_json(self, payload: Any) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        # Columnar JSON: {"columns": {name: [values]}, "label": [values]}
+        if isinstance(payload, dict) and 'columns' in payload:
+            columns = payload['columns']
+            missing = [name for name in self.feature_names if name not in columns]
+            if missing:
+                raise ValueError(f"Batch is missing columns: {missing}")
+            features = np.column_stack([self._numeric(columns[name]) for name in self.feature_names])
+            labels = payload.get('label')
+            addresses = None
+            if all(name in columns for name in self.ADDRESS_COLUMNS):
+                addresses = self._addresses(*(columns[name] for name in self.ADDRESS_COLUMNS))
+            return features, None if labels is None else self._numeric(labels), addresses
+
+        records = payload.get('records') if isinstance(payload, dict) else payload
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records[:1]):
+            raise ValueError("Expected a list of records or a columnar object")
+        if not records:
+            return np.empty((0, len(self.feature_names))), None, None
+
+        try:
+            # C-level key extraction; falls back per column when keys are missing or values are not numbers
+            features = np.array(list(map(self._getter, records)), dtype=np.float64)
+        except (KeyError, TypeError, ValueError):
+            missing = [name for name in self.feature_names if name not in records[0]]
+            if missing:
+                raise ValueError(f"Batch is missing columns: {missing}")
+            features = np.column_stack([self._numeric([record.get(name) for record in records])
+                                        for name in self.feature_names])
+        labels = None
+        if 'label' in records[0]:
+            labels = self._numeric([record.get('label') for record in records])
+        addresses = None
+        if all(name in records[0] for name in self.ADDRESS_COLUMNS):
+            addresses = self._addresses(*([record.get(name) for record in records] for name in self.ADDRESS_COLUMNS))
+        return features, labels, addresses
+
+    @staticmethod
+    def _addresses(src: Any, dst: Any) -> np.ndarray:
+        """(rows, 2) src/dst as int64 IPv4 addresses; -1 marks a value that is not an address"""
+        columns = []
+        for values in (src, dst):
+            try:
+                numbers = np.asarray(values, dtype=np.float64)
+                valid = (numbers >= 0) & (numbers < 2 ** 32) & (numbers == np.floor(numbers))
+                keys = numbers.astype(np.int64, copy=False) if valid.all() else \
+                    np.where(valid, np.nan_to_num(numbers), -1).astype(np.int64)
+            except (TypeError, ValueError):
+                # Dotted quads, parsed for the whole column at once
+                keys, valid = IPReputationIndex.to_uint32(list(values))
+                keys = np.where(valid, keys.astype(np.int64), -1)
+            columns.append(keys)
+        return np.column_stack(columns)
+
+    @staticmethod
+    def _numeric(values: Any) -> np.ndarray:
+        """Column to float64; unparseable or missing values become NaN and fail validation"""
+        try:
+            return np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+
+    @staticmethod
+    def _validate(features: np.ndarray, labels: Optional[np.ndarray], addresses: Optional[np.ndarray] = None
+                  ) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray], int]:
+        """Drop rows with non-finite features, labels other than 0/1 or addresses that do not parse"""
+        valid = np.isfinite(features).all(axis=1)
+        if labels is not None:
+            valid &= (labels == 0) | (labels == 1)
+        if addresses is not None:
+            valid &= (addresses >= 0).all(axis=1)
+        rejected = len(valid) - int(np.count_nonzero(valid))
+        if rejected:
+            features = features[valid]
+            labels = None if labels is None else labels[valid]
+            addresses = None if addresses is None else addresses[valid]
+        if addresses is not None:
+            addresses = addresses.astype(np.uint32)
+        return features, labels, addresses, rejected
+
+    def submit(self, features: np.ndarray, labels: Optional[np.ndarray] = None, rejected: int = 0,
+               addresses: Optional[np.ndarray] = None) -> bool:
+        """Queue a validated batch; returns False (and queues nothing) when the queue is full"""
+        with self._condition:
+            self.rows_rejected += rejected
+            INGEST_ROWS_TOTAL.labels('rejected').inc(rejected)
+            if self._queued_rows + len(features) > self.max_queue_rows:
+                self.rows_throttled += len(features)
+                INGEST_ROWS_TOTAL.labels('throttled').inc(len(features))
+                return False
+            self._queue.append((features, labels, addresses))
+            self._queued_rows += len(features)
+            self.rows_accepted += len(features)
+            INGEST_ROWS_TOTAL.labels('accepted').inc(len(features))
+            self._condition.notify()
+        return True
+
+    def retry_after(self) -> int:
+        """Seconds until the queue should have drained enough to accept more"""
+        with self._condition:
+            rate = self._drain_rate or 1.0
+            return int(min(60, max(1, np.ceil(self._queued_rows / rate))))
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._drain_loop, name='fl-ingest', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop routing; rows still queued are discarded"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _drain_loop(self):
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                features, labels, addresses = self._queue.popleft()
+
+            route_start = time.perf_counter()
+            try:
+                self.route(features, labels, addresses)
+            except Exception as e:
+                logging.error(f"Ingest routing error: {e}")
+            elapsed = time.perf_counter() - route_start
+
+            with self._condition:
+                self._queued_rows -= len(features)
+                self.rows_routed += len(features)
+                if elapsed > 0:
+                    rate = len(features) / elapsed
+                    self._drain_rate = rate if self._drain_rate is None else 0.8 * self._drain_rate + 0.2 * rate
+
+    def route(self, features: np.ndarray, labels: Optional[np.ndarray] = None, addresses: Optional[np.ndarray] = None):
+        """Score every row and spread labelled rows across the nodes' streaming training windows"""
+        if self.scoring_engine is not None and len(features):
+            if addresses is not None:
+                self.scoring_engine.submit(features, addresses[:, 0], addresses[:, 1])
+            else:
+                self.scoring_engine.submit(features)
+
+        if labels is None or not len(features):
+            return
+        nodes = self.nodes() if callable(self.nodes) else (self.nodes or {})
+        targets = [node for node in list(nodes.values()) if hasattr(node, 'append_training_arrays')]
+        if not targets:
+            return
+
+        # Rotate which node takes the first (largest) share so small batches still spread evenly
+        shares = np.array_split(np.arange(len(features)), len(targets))
+        for i, share in enumerate(shares):
+            if len(share):
+                node = targets[(self._next_node + i) % len(targets)]
+                node.append_training_arrays(features[share], labels[share], self.feature_names)
+        self._next_node = (self._next_node + 1) % len(targets)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'rows_accepted': self.rows_accepted,
+                'rows_rejected': self.rows_rejected,
+                'rows_throttled': self.rows_throttled,
+                'rows_routed': self.rows_routed,
+                'queued_rows': self._queued_rows,
+                'max_queue_rows': self.max_queue_rows,
+                'drain_rows_per_second': self._drain_rate
+            }
+
 # Testing and performance evaluation
 class FLPerformanceTester:
     """Comprehensive FL system testing"""
@@ -509,15 +3691,25 @@ class FLPerformanceTester:
     def __init__(self):
         self.test_results = {}
     
-    def run_comprehensive_test(self) -> Dict[str, Any]:
-        """Run comprehensive FL system tests"""
-        results = {
-            'timestamp': datetime.now().isoformat(),
-            'privacy_tests': self._test_privacy_mechanisms(),
-            'byzantine_tests': self._test_byzantine_tolerance(),
-            'algorithm_benchmarks': self._benchmark_algorithms(),
-            'system_performance': self._test_system_performance()
-        }
+    def run_comprehensive_test(self, progress: Optional[Callable[[str, int, int, Optional[float]], None]] = None
+                               ) -> Dict[str, Any]:
+        """Run comprehensive FL system tests; progress(stage, index, total, duration) is called as each
+        stage starts (duration None) and finishes"""
+        stages = [
+            ('privacy_tests', self._test_privacy_mechanisms),
+            ('byzantine_tests', self._test_byzantine_tolerance),
+            ('algorithm_benchmarks', self._benchmark_algorithms),
+            ('system_performance', self._test_system_performance)
+        ]
+        
+        results = {'timestamp': datetime.now().isoformat()}
+        for index, (stage, run_stage) in enumerate(stages):
+            if progress:
+                progress(stage, index, len(stages), None)
+            start_time = time.time()
+            results[stage] = run_stage()
+            if progress:
+                progress(stage, index, len(stages), time.time() - start_time)
         
         return results
     
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+AgisFL Metrics - Lightweight in-process instrumentation
+Counters, gauges and fixed-bucket histograms rendered in the Prometheus text exposition format
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds, from sub-millisecond hot paths up to slow training rounds
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: '_Metric'):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional['_Metric']:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for suffix, labels, value in metric.samples():
+                lines.append(f'{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """Base for labelled metrics; children are created under a lock, updates take no lock"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[MetricsRegistry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lookup = {}  # Raw labels() arguments -> child, so repeat lookups skip normalisation
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self._new_child()
+        if self._default is not None:
+            self._bind(self._default)
+        if registry is not None:
+            registry.register(self)
+
+    def _bind(self, child):
+        """Point an unlabelled metric's update methods straight at its only child"""
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **kwargs: Any):
+        """Child metric for one combination of label values (cached, so hot paths can hold on to it)"""
+        if not kwargs:
+            child = self._lookup.get(values)
+            if child is not None:
+                return child
+        key = tuple(str(value) for value in values) if values else \
+            tuple(str(kwargs[name]) for name in self.labelnames)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        with self._lock:
+            child = self._children.setdefault(key, self._new_child())
+            if not kwargs:
+                self._lookup[values] = child
+        return child
+
+    def _unlabelled(self):
+        if self._default is None:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use labels()")
+        return self._default
+
+    def _series(self) -> Iterable[Tuple[Tuple[Tuple[str, str], ...], Any]]:
+        if self._default is not None:
+            yield (), self._default
+        for key, child in list(self._children.items()):
+            yield tuple(zip(self.labelnames, key)), child
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        raise NotImplementedError
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        # A single in-place add: can rarely lose an update under thread preemption, never blocks
+        self.value += amount
+
+class Counter(_Metric):
+    """Monotonically increasing count; by convention the name ends in _total"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _bind(self, child: _CounterChild):
+        self.inc = child.inc
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    @property
+    def value(self) -> float:
+        return self._unlabelled().value
+
+    def samples(self):
+        return [('', labels, child.value) for labels, child in self._series()]
+
+class _GaugeChild:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from function at render time instead of storing it"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _bind(self, child: _GaugeChild):
+        self.set, self.inc, self.dec = child.set, child.inc, child.dec
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._unlabelled().set_function(function)
+
+    @property
+    def value(self) -> float:
+        return self._unlabelled().get()
+
+    def samples(self):
+        return [('', labels, child.get()) for labels, child in self._series()]
+
+_perf_counter = time.perf_counter
+
+class _Timer:
+    __slots__ = ('observe', 'start')
+
+    def __init__(self, observe: Callable[[float], None]):
+        self.observe = observe
+
+    def __enter__(self):
+        self.start = _perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.observe(_perf_counter() - self.start)
+
+class _HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # Per-bucket (not cumulative); last is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> _Timer:
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self.observe)
+
+class Histogram(_Metric):
+    """Fixed-bucket distribution with sum and count"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[MetricsRegistry] = REGISTRY):
+        self.upper_bounds = tuple(sorted(float(bound) for bound in buckets if not math.isinf(bound)))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def _bind(self, child: '_HistogramChild'):
+        self.observe = child.observe
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self._unlabelled().observe)
+
+    def snapshot(self, *label_values: Any) -> Dict[str, Any]:
+        """Count, sum and cumulative bucket counts of one series"""
+        child = self.labels(*label_values) if label_values else self._unlabelled()
+        counts = list(child.counts)
+        cumulative = [sum(counts[:i + 1]) for i in range(len(counts))]
+        return {'count': cumulative[-1], 'sum': child.sum,
+                'buckets': dict(zip(self.upper_bounds + (math.inf,), cumulative))}
+
+    def samples(self):
+        samples = []
+        for labels, child in self._series():
+            counts = list(child.counts)  # Copy first so the series is internally consistent
+            total = 0
+            for bound, count in zip(self.upper_bounds + (math.inf,), counts):
+                total += count
+                samples.append(('_bucket', labels + (('le', _format_value(bound)),), total))
+            samples.append(('_sum', labels, child.sum))
+            samples.append(('_count', labels, total))
+        return samples
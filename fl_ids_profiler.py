@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+AgisFL Profiler - On-demand profiling of a running process
+Time-bounded stack sampling rendered as collapsed stacks for flamegraphs, and tracemalloc snapshot diffs
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import CodeType
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+class SamplingProfiler:
+    """Samples every thread's Python stack from a background thread at a fixed interval.
+
+    Nothing is hooked into the profiled code, so it costs nothing while stopped and attaches to any
+    component without call-site changes; focus classes keep only stacks passing through their methods.
+    """
+
+    def __init__(self, max_duration: float = 300.0, max_depth: int = 128):
+        self.max_duration = max_duration  # Upper bound on any session, whatever the caller asks for
+        self.max_depth = max_depth
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._session = None
+        self._stacks = Counter()
+        self._labels = {}  # Code object -> frame label, reused across samples
+        self._focus = frozenset()
+        self._thread_prefixes = ()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float = 30.0, interval: float = 0.005, threads: Optional[Sequence[str]] = None,
+              focus: Iterable[type] = ()) -> Dict[str, Any]:
+        """Sample for up to duration seconds; threads limits sampling to thread names with these prefixes"""
+        focus = list(focus)
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profiler is already running")
+            if interval <= 0 or duration <= 0:
+                raise ValueError("Duration and interval must be positive")
+            duration = min(float(duration), self.max_duration)
+
+            self._stacks = Counter()
+            self._focus = frozenset(code for cls in focus for code in _class_code_objects(cls))
+            self._thread_prefixes = tuple(threads or ())
+            self._stop.clear()
+            self._session = {
+                'started': time.time(), 'finished': None, 'duration': duration, 'interval': interval,
+                'threads': list(self._thread_prefixes), 'focus': [cls.__name__ for cls in focus],
+                'samples': 0, 'stacks_sampled': 0, 'stacks_outside_focus': 0, 'sampling_time': 0.0
+            }
+            self._thread = threading.Thread(target=self._run, args=(duration, interval),
+                                            name='agisfl-profiler', daemon=True)
+            self._thread.start()
+            return self.status()
+
+    def stop(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """End the session early; results stay available until the next start"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+        return self.status()
+
+    def _run(self, duration: float, interval: float):
+        own_ident = threading.get_ident()
+        session = self._session
+        deadline = time.monotonic() + duration
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            sample_start = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            outside_focus = 0
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                name = names.get(ident, f'thread-{ident}')
+                if self._thread_prefixes and not name.startswith(self._thread_prefixes):
+                    continue
+                stack = self._collapse(frame)
+                if stack is None:
+                    outside_focus += 1
+                else:
+                    stacks.append(f"{name.replace(';', '_')};{stack}")
+            frame = None  # Do not keep another thread's frame alive between samples
+
+            with self._lock:
+                self._stacks.update(stacks)
+                session['samples'] += 1
+                session['stacks_sampled'] += len(stacks)
+                session['stacks_outside_focus'] += outside_focus
+                session['sampling_time'] += time.perf_counter() - sample_start
+
+        with self._lock:
+            session['finished'] = time.time()
+
+    def _collapse(self, frame) -> Optional[str]:
+        """Root-first ';'-joined frame labels, or None when the stack misses every focus method"""
+        labels = []
+        focused = not self._focus
+        while frame is not None and len(labels) < self.max_depth:
+            code = frame.f_code
+            if not focused and code in self._focus:
+                focused = True
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = \
+                    f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            labels.append(label)
+            frame = frame.f_back
+        if not focused:
+            return None
+        labels.reverse()
+        return ';'.join(labels)
+
+    def collapsed(self) -> str:
+        """One 'thread;outer;...;inner count' line per distinct stack, as flamegraph.pl and speedscope read"""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._session is None:
+                return {'running': False, 'session': None}
+            session = dict(self._session)
+            distinct = len(self._stacks)
+        elapsed = (session['finished'] or time.time()) - session['started']
+        session.update(elapsed=elapsed, distinct_stacks=distinct,
+                       overhead=session['sampling_time'] / elapsed if elapsed > 0 else 0.0)
+        return {'running': self.running, 'session': session}
+
+def _class_code_objects(cls: type) -> Iterable[CodeType]:
+    """Code objects of a class's methods (including inherited ones) and the functions nested in them"""
+    for klass in cls.__mro__:
+        if klass is object:
+            continue
+        for attribute in vars(klass).values():
+            if isinstance(attribute, (staticmethod, classmethod)):
+                attribute = attribute.__func__
+            if isinstance(attribute, property):
+                functions = [attribute.fget, attribute.fset, attribute.fdel]
+            else:
+                functions = [attribute]
+            for function in functions:
+                code = getattr(function, '__code__', None)
+                if isinstance(code, CodeType):
+                    yield from _nested_code_objects(code)
+
+def _nested_code_objects(code: CodeType) -> Iterable[CodeType]:
+    yield code
+    for constant in code.co_consts:
+        if isinstance(constant, CodeType):
+            yield from _nested_code_objects(constant)
+
+class AllocationTracker:
+    """tracemalloc baseline snapshots and diffs against them; tracing (and its overhead) only runs
+    between the first snapshot and stop()"""
+
+    GROUP_BY = ('lineno', 'filename', 'traceback')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline = None
+        self._baseline_time = None
+        self._started_tracing = False
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')
+        ))
+
+    def snapshot(self, frames: int = 10) -> Dict[str, Any]:
+        """Start tracing if needed and record a new baseline; allocations made before tracing are not seen"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._started_tracing = True
+            self._baseline = self._take_snapshot()
+            self._baseline_time = time.time()
+            return self._status()
+
+    def diff(self, limit: int = 20, group_by: str = 'lineno') -> Dict[str, Any]:
+        """Largest allocation changes since the baseline"""
+        if group_by not in self.GROUP_BY:
+            raise ValueError(f"group_by must be one of {self.GROUP_BY}")
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                raise RuntimeError("No baseline snapshot; take one first")
+            stats = self._take_snapshot().compare_to(self._baseline, group_by)
+            status = self._status()
+
+        return dict(status, group_by=group_by,
+                    total_size_diff=sum(stat.size_diff for stat in stats),
+                    total_count_diff=sum(stat.count_diff for stat in stats),
+                    top=[{
+                        'size_diff': stat.size_diff,
+                        'size': stat.size,
+                        'count_diff': stat.count_diff,
+                        'count': stat.count,
+                        'traceback': [f'{frame.filename}:{frame.lineno}' for frame in stat.traceback]
+                    } for stat in stats[:limit]])
+
+    def stop(self) -> Dict[str, Any]:
+        """Drop the baseline and stop tracing if this tracker started it"""
+        with self._lock:
+            if self._started_tracing and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._started_tracing = False
+            self._baseline = None
+            self._baseline_time = None
+            return self._status()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._status()
+
+    def _status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else 0,
+            'baseline_taken': self._baseline_time,
+            'traced_bytes': current,
+            'peak_traced_bytes': peak
+        }